@@ -1,71 +1,353 @@
-from app.services.openai_service import OpenAIService
 from app.services.groq_service import GroqService
-from app.services.mock_openai_service import MockOpenAIService
-from app.models.schemas import ATSScreeningResult, ATSScanResult, SkillGapAnalysis, CandidateSummary, InterviewQuestions
+from app.services.llm_router import cacheable, create_llm_service
+from app.services.result_cache import get_result_cache
+from app.services.jd_registry import get_jd_registry
+from app.agents.resume_agent import ResumeAgent
+from app.models.schemas import ATSScreeningResult, ATSScanResult, SkillGapAnalysis, CandidateSummary, InterviewQuestions, JobRequirements, ProcessedJobDescription
 from app.utils.text_cleaner import TextCleaner
+from app.utils.skill_matcher import SkillMatcher
+from app.utils.token_budget import TokenBudget, context_window, count_tokens
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from pydantic import ValidationError, create_model
 from app.config import Config
 
+# analyze_full sections: (standalone prompt whose cache entry it shares, result model, uses the JD, JSON shape)
+FULL_ANALYSIS_SECTIONS = {
+    "screening": ("ats_screening.prompt", ATSScreeningResult, True, """{
+  "overall_match_score": number (0-100),
+  "technical_skill_match": number (0-100),
+  "project_relevance_score": number (0-100),
+  "experience_score": number (0-100),
+  "final_decision": "SHORTLIST" or "REJECT",
+  "decision_reason": "3-4 lines realistic recruiter explanation",
+  "matched_skills": [list],
+  "missing_critical_skills": [list],
+  "nice_to_have_missing_skills": [list],
+  "strengths": [list of bullet points],
+  "weaknesses": [list of bullet points]
+ }"""),
+    "ats_scan": ("ats_scanner.prompt", ATSScanResult, False, """{
+  "ats_score": number (0-100) for how ATS-friendly the resume format is,
+  "ats_issues": [list],
+  "improvement_suggestions": [list]
+ }"""),
+    "skill_gaps": ("skill_gap.prompt", SkillGapAnalysis, True, """{
+  "must_have_missing_skills": [list],
+  "good_to_have_missing_skills": [list],
+  "learning_recommendations": [list of courses/topics]
+ }"""),
+    "summary": ("candidate_summary.prompt", CandidateSummary, False, """{
+  "candidate_level": "Fresher/Junior/Mid/Senior",
+  "key_expertise": [list of 3-5 skills],
+  "most_impressive_project": "brief description",
+  "hiring_recommendation": "one sentence recommendation"
+ }"""),
+    "interview_questions": ("interview_questions.prompt", InterviewQuestions, True, """{
+  "technical_questions": [5 questions],
+  "project_questions": [3 questions],
+  "hr_questions": [2 questions]
+ }"""),
+}
+
 class ATSAgent:
-    def __init__(self):
-        if Config.DEMO_MODE:
-            self.llm_service = MockOpenAIService()
-        elif Config.USE_GROQ:
-            self.llm_service = GroqService()
-        else:
-            self.llm_service = OpenAIService()
+    def __init__(self, use_compressed_resume: bool = None, cascade: bool = None):
+        self.llm_service = create_llm_service()
+        self.cascade = Config.CASCADE_ENABLED if cascade is None else cascade
+        self.small_llm_service = create_llm_service("small") if self.cascade else None
         self.text_cleaner = TextCleaner()
+        self.skill_matcher = SkillMatcher()
+        self.result_cache = get_result_cache()
+        self.use_compressed_resume = Config.USE_COMPRESSED_RESUME if use_compressed_resume is None else use_compressed_resume
+        self.resume_agent = ResumeAgent() if self.use_compressed_resume else None
+        self.jd_registry = get_jd_registry()
+        # Both cascade tiers get the same screening prompt, so it is fitted to the smaller window
+        models = [service.model for service in (self.llm_service, self.small_llm_service) if service]
+        self.token_budget = TokenBudget(min(models, key=context_window))
+    
+    def _fit_resume(self, resume_text: str, prompt_file: str, **prompt_args) -> str:
+        # Cuts an over-long resume down to what fits beside the rest of the rendered prompt
+        reserved = count_tokens(self.llm_service.load_prompt(prompt_file, resume_text="", **prompt_args), self.llm_service.model)
+        return self.text_cleaner.clean_text(self.token_budget.fit_resume(resume_text, reserved))
+    
+    def _resume_input(self, resume_text: str, prompt_file: str, **prompt_args) -> str:
+        # The compact ResumeData rendering replaces the full text in content prompts when compression is on.
+        # A resume the compression step cannot handle falls back to its cleaned full text.
+        if self.resume_agent:
+            try:
+                return self.resume_agent.compact_text(resume_text)
+            except Exception:
+                pass
+        return self._fit_resume(resume_text, prompt_file, **prompt_args)
+    
+    def _jd_input(self, job_description: Union[str, ProcessedJobDescription]) -> str:
+        # Batch callers pass the registry handle; plain text is looked up so each JD is cleaned once
+        if isinstance(job_description, ProcessedJobDescription):
+            return job_description.cleaned_text
+        return self.jd_registry.get(job_description).cleaned_text
+    
+    def _cache_key(self, prompt_file: str, llm_service=None, **prompt_args) -> str:
+        return self.result_cache.make_key(prompt_file, (llm_service or self.llm_service).model, Config.TEMPERATURE, **prompt_args)
     
-    def screen_resume(self, resume_text: str, job_description: str) -> ATSScreeningResult:
-        cleaned_resume = self.text_cleaner.clean_text(resume_text)
-        cleaned_jd = self.text_cleaner.clean_text(job_description)
+    def _run(self, prompt_file: str, result_type, llm_service=None, **prompt_args):
+        llm_service = llm_service or self.llm_service
+        key = self._cache_key(prompt_file, llm_service, **prompt_args) if self.result_cache else None
+        if key:
+            cached = self.result_cache.get(key, result_type)
+            if cached is not None:
+                return cached
+                
+        prompt = llm_service.load_prompt(prompt_file, **prompt_args)
+        response = llm_service.chat_completion(prompt, response_model=result_type)
+        result = result_type(**response)
         
-        prompt = self.llm_service.load_prompt(
-            "ats_screening.prompt",
-            resume_text=cleaned_resume,
-            job_description=cleaned_jd
+        if key and cacheable(llm_service):
+            self.result_cache.set(key, result)
+        return result
+    
+    def prescreen(self, resume_text: str, job_requirements: JobRequirements) -> Optional[ATSScreeningResult]:
+        # Deterministic keyword check; returns a REJECT result when too few required skills appear, otherwise None
+        required = job_requirements.required_skills
+        if not required:
+            return None
+        
+        matched, missing = self.skill_matcher.match(resume_text, required)
+        match_ratio = len(matched) / len(required)
+        if match_ratio >= Config.PRESCREEN_MIN_SKILL_MATCH:
+            return None
+        
+        _, preferred_missing = self.skill_matcher.match(resume_text, job_requirements.preferred_skills)
+        score = round(match_ratio * 100, 1)
+        return ATSScreeningResult(
+            overall_match_score=score,
+            technical_skill_match=score,
+            project_relevance_score=0,
+            experience_score=0,
+            matched_skills=matched,
+            missing_critical_skills=missing,
+            nice_to_have_missing_skills=preferred_missing,
+            strengths=[f"Mentions {skill}" for skill in matched],
+            weaknesses=[f"No mention of required skill: {skill}" for skill in missing],
+            final_decision="REJECT",
+            decision_reason=(
+                f"Automatically rejected by the keyword pre-screen: the resume mentions {len(matched)} of "
+                f"{len(required)} required skills, below the {Config.PRESCREEN_MIN_SKILL_MATCH:.0%} minimum. "
+                "No LLM screening was run."
+            ),
+            decided_by="prescreen"
         )
+    
+    def screen_resume(self, resume_text: str, job_description: Union[str, ProcessedJobDescription], job_requirements: JobRequirements = None) -> ATSScreeningResult:
+        if job_requirements is not None:
+            rejected = self.prescreen(resume_text, job_requirements)
+            if rejected is not None:
+                return rejected
+        
+        prompt_args = self.screening_args(resume_text, job_description)
+        if self.small_llm_service:
+            settled = self._small_tier_screening(prompt_args)
+            if settled is not None:
+                return settled
+            return self._run("ats_screening.prompt", ATSScreeningResult, **prompt_args).model_copy(update={'decided_by': "llm-large"})
+        return self._run("ats_screening.prompt", ATSScreeningResult, **prompt_args)
+    
+    def _small_tier_screening(self, prompt_args: Dict[str, str]) -> Optional[ATSScreeningResult]:
+        # First cascade tier: the small model's result stands unless its score is within CASCADE_UNCERTAINTY_BAND
+        # of the shortlist threshold or its decision disagrees with the side of the threshold it scored on.
+        # A failed small-model call simply escalates.
+        try:
+            result = self._run("ats_screening.prompt", ATSScreeningResult, self.small_llm_service, **prompt_args)
+        except Exception:
+            return None
+        return result.model_copy(update={'decided_by': "llm-small"}) if self._is_clear_cut(result) else None
+    
+    @staticmethod
+    def _is_clear_cut(result: ATSScreeningResult) -> bool:
+        margin = result.overall_match_score - Config.SHORTLIST_SCORE_THRESHOLD
+        return abs(margin) > Config.CASCADE_UNCERTAINTY_BAND and (margin > 0) == (result.final_decision == "SHORTLIST")
+    
+    def pack_limits(self, job_description: Union[str, ProcessedJobDescription]) -> Tuple[int, int]:
+        # (candidates, resume tokens) one packed call can take: the count is capped by the completion budget,
+        # the tokens by what is left of the prompt budget after the shared instructions and JD
+        llm_service = self.small_llm_service or self.llm_service
+        header = llm_service.load_prompt("ats_screening_packed.prompt", job_description=self._jd_input(job_description), candidates="")
+        max_candidates = max(1, min(Config.PACKED_MAX_CANDIDATES, Config.MAX_TOKENS // Config.PACKED_TOKENS_PER_RESULT))
+        return max_candidates, self.token_budget.prompt_budget - count_tokens(header, llm_service.model)
+    
+    def screen_pack(self, resume_texts: List[str], job_description: Union[str, ProcessedJobDescription], job_requirements: JobRequirements = None) -> Dict[int, ATSScreeningResult]:
+        # Screens several resumes in one call that shares the instructions and JD. Results are keyed by position
+        # in resume_texts, since uploads can share a filename; only candidates with a valid answer are returned
+        # and the caller screens the rest one by one.
+        # Each answer is cached under its single-resume key, so a later screen_resume of the same pair is a hit.
+        # With the cascade on the pack goes to the small tier and only its clear-cut results are returned.
+        llm_service = self.small_llm_service or self.llm_service
+        results = {}
+        pending = {}
+        for position, resume_text in enumerate(resume_texts):
+            rejected = self.prescreen(resume_text, job_requirements) if job_requirements is not None else None
+            if rejected is not None:
+                results[position] = rejected
+                continue
+            prompt_args = self.screening_args(resume_text, job_description)
+            key = self._cache_key("ats_screening.prompt", llm_service, **prompt_args) if self.result_cache else None
+            cached = self.result_cache.get(key, ATSScreeningResult) if key else None
+            if cached is not None:
+                results[position] = self._pack_tier(cached)
+            else:
+                pending[position] = (prompt_args, key)
         
-        response = self.llm_service.chat_completion(prompt)
-        return ATSScreeningResult(**response)
+        if pending:
+            ids = {f"C{index}": position for index, position in enumerate(pending, start=1)}
+            candidates = "\n\n".join(f"### Candidate {candidate_id}\n{pending[position][0]['resume_text']}" for candidate_id, position in ids.items())
+            prompt = llm_service.load_prompt("ats_screening_packed.prompt", job_description=self._jd_input(job_description), candidates=candidates)
+            # Entries are optional here so one bad candidate is retried alone instead of repairing the whole answer
+            response_model = create_model("PackedScreening", **{candidate_id: (Optional[Dict[str, Any]], None) for candidate_id in ids})
+            response = llm_service.chat_completion(prompt, response_model=response_model)
+            for candidate_id, position in ids.items():
+                try:
+                    result = ATSScreeningResult(**response[candidate_id])
+                except (KeyError, TypeError, ValidationError):
+                    continue
+                _, key = pending[position]
+                if key and cacheable(llm_service):
+                    self.result_cache.set(key, result)
+                results[position] = self._pack_tier(result)
+        
+        return {position: result for position, result in results.items() if result is not None}
+    
+    def _pack_tier(self, result: ATSScreeningResult) -> Optional[ATSScreeningResult]:
+        if not self.small_llm_service:
+            return result
+        return result.model_copy(update={'decided_by': "llm-small"}) if self._is_clear_cut(result) else None
+    
+    def screening_args(self, resume_text: str, job_description: Union[str, ProcessedJobDescription]) -> Dict[str, str]:
+        # The exact ats_screening.prompt arguments screen_resume would send, for callers that submit the prompt elsewhere
+        cleaned_jd = self._jd_input(job_description)
+        cleaned_resume = self._resume_input(resume_text, "ats_screening.prompt", job_description=cleaned_jd)
+        return {'resume_text': cleaned_resume, 'job_description': cleaned_jd}
+    
+    def screen_resume_stream(self, resume_text: str, job_description: Union[str, ProcessedJobDescription], job_requirements: JobRequirements = None) -> Iterator[Union[Dict[str, Any], ATSScreeningResult]]:
+        # Yields the screening fields completed so far as the response streams in, then the validated result
+        if job_requirements is not None:
+            rejected = self.prescreen(resume_text, job_requirements)
+            if rejected is not None:
+                yield rejected
+                return
+        
+        # With the cascade on, the small tier answers in one piece and only an escalation is streamed
+        prompt_args = self.screening_args(resume_text, job_description)
+        decided_by = None
+        if self.small_llm_service:
+            settled = self._small_tier_screening(prompt_args)
+            if settled is not None:
+                yield settled
+                return
+            decided_by = "llm-large"
+        
+        key = self._cache_key("ats_screening.prompt", **prompt_args) if self.result_cache else None
+        if key:
+            cached = self.result_cache.get(key, ATSScreeningResult)
+            if cached is not None:
+                yield cached.model_copy(update={'decided_by': decided_by}) if decided_by else cached
+                return
+        
+        prompt = self.llm_service.load_prompt("ats_screening.prompt", **prompt_args)
+        response = None
+        for response in self.llm_service.chat_completion_stream(prompt, response_model=ATSScreeningResult):
+            yield response
+        # The stream's last item has already been through validation and repair; output that still fails raises
+        # here rather than paying for the full prompt again, and only a valid result is cached
+        result = ATSScreeningResult.model_validate(response)
+        if key and cacheable(self.llm_service):
+            self.result_cache.set(key, result)
+        yield result.model_copy(update={'decided_by': decided_by}) if decided_by else result
     
     def scan_resume_format(self, resume_text: str) -> ATSScanResult:
-        cleaned_resume = self.text_cleaner.clean_text(resume_text)
+        cleaned_resume = self._fit_resume(resume_text, "ats_scanner.prompt")
         
-        prompt = self.llm_service.load_prompt(
+        return self._run(
             "ats_scanner.prompt",
+            ATSScanResult,
             resume_text=cleaned_resume
         )
-        
-        response = self.llm_service.chat_completion(prompt)
-        return ATSScanResult(**response)
     
-    def analyze_skill_gaps(self, resume_text: str, job_description: str) -> SkillGapAnalysis:
-        cleaned_resume = self.text_cleaner.clean_text(resume_text)
-        cleaned_jd = self.text_cleaner.clean_text(job_description)
+    def analyze_skill_gaps(self, resume_text: str, job_description: Union[str, ProcessedJobDescription]) -> SkillGapAnalysis:
+        cleaned_jd = self._jd_input(job_description)
+        cleaned_resume = self._resume_input(resume_text, "skill_gap.prompt", job_description=cleaned_jd)
         
-        prompt = self.llm_service.load_prompt(
+        return self._run(
             "skill_gap.prompt",
+            SkillGapAnalysis,
             resume_text=cleaned_resume,
             job_description=cleaned_jd
         )
-        
-        response = self.llm_service.chat_completion(prompt)
-        return SkillGapAnalysis(**response)
     
     def summarize_candidate(self, resume_text: str) -> CandidateSummary:
-        cleaned_resume = self.text_cleaner.clean_text(resume_text)
+        cleaned_resume = self._resume_input(resume_text, "candidate_summary.prompt")
         
-        prompt = self.llm_service.load_prompt(
+        return self._run(
             "candidate_summary.prompt",
+            CandidateSummary,
             resume_text=cleaned_resume
         )
+    
+    def analyze_full(self, resume_text: str, job_description: Union[str, ProcessedJobDescription], analyses: List[str] = None) -> Dict[str, Any]:
+        # Runs any subset of FULL_ANALYSIS_SECTIONS in one LLM call and splits the answer into the usual models.
+        # Sections already cached by the standalone methods are not requested again.
+        analyses = analyses or list(FULL_ANALYSIS_SECTIONS)
+        unknown = [name for name in analyses if name not in FULL_ANALYSIS_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown analyses: {', '.join(unknown)}")
+        
+        # The resume is budgeted against the prompt for every requested section, so cache keys
+        # do not depend on which sections happen to be cached already
+        cleaned_jd = self._jd_input(job_description)
+        budget_args = {'sections': ", ".join(analyses), 'schema': self._full_analysis_schema(analyses), 'job_description': cleaned_jd}
+        
+        # The format scan needs the original layout, so it always sees the full text
+        if "ats_scan" in analyses:
+            cleaned_resume = self._fit_resume(resume_text, "full_analysis.prompt", **budget_args)
+        else:
+            cleaned_resume = self._resume_input(resume_text, "full_analysis.prompt", **budget_args)
+        
+        results = {}
+        keys = {}
+        for name in analyses:
+            prompt_file, result_type, uses_jd, _ = FULL_ANALYSIS_SECTIONS[name]
+            if not self.result_cache:
+                continue
+            prompt_args = {'resume_text': cleaned_resume, 'job_description': cleaned_jd} if uses_jd else {'resume_text': cleaned_resume}
+            keys[name] = self._cache_key(prompt_file, **prompt_args)
+            cached = self.result_cache.get(keys[name], result_type)
+            if cached is not None:
+                results[name] = cached
         
-        response = self.llm_service.chat_completion(prompt)
-        return CandidateSummary(**response)
+        missing = [name for name in analyses if name not in results]
+        if missing:
+            prompt = self.llm_service.load_prompt(
+                "full_analysis.prompt",
+                sections=", ".join(missing),
+                schema=self._full_analysis_schema(missing),
+                resume_text=cleaned_resume,
+                job_description=cleaned_jd
+            )
+            
+            response_model = create_model("FullAnalysis", **{name: (FULL_ANALYSIS_SECTIONS[name][1], ...) for name in missing})
+            response = self.llm_service.chat_completion(prompt, response_model=response_model)
+            for name in missing:
+                result = FULL_ANALYSIS_SECTIONS[name][1](**response[name])
+                if name in keys and cacheable(self.llm_service):
+                    self.result_cache.set(keys[name], result)
+                results[name] = result
+        
+        return {name: results[name] for name in analyses}
+    
+    @staticmethod
+    def _full_analysis_schema(analyses: List[str]) -> str:
+        return "{\n" + ",\n".join(f' "{name}": {FULL_ANALYSIS_SECTIONS[name][3]}' for name in analyses) + "\n}"
     
-    def answer_recruiter_question(self, resume_text: str, job_description: str, question: str) -> str:
-        cleaned_resume = self.text_cleaner.clean_text(resume_text)
-        cleaned_jd = self.text_cleaner.clean_text(job_description)
+    def answer_recruiter_question(self, resume_text: str, job_description: Union[str, ProcessedJobDescription], question: str) -> str:
+        cleaned_jd = self._jd_input(job_description)
+        cleaned_resume = self._resume_input(resume_text, "recruiter_qa.prompt", job_description=cleaned_jd, question=question)
         
         prompt = self.llm_service.load_prompt(
             "recruiter_qa.prompt",
@@ -96,15 +378,13 @@ class ATSAgent:
                 return resp.choices[0].message.content.strip()
             return "The candidate has relevant experience for this role."
     
-    def generate_interview_questions(self, resume_text: str, job_description: str) -> InterviewQuestions:
-        cleaned_resume = self.text_cleaner.clean_text(resume_text)
-        cleaned_jd = self.text_cleaner.clean_text(job_description)
+    def generate_interview_questions(self, resume_text: str, job_description: Union[str, ProcessedJobDescription]) -> InterviewQuestions:
+        cleaned_jd = self._jd_input(job_description)
+        cleaned_resume = self._resume_input(resume_text, "interview_questions.prompt", job_description=cleaned_jd)
         
-        prompt = self.llm_service.load_prompt(
+        return self._run(
             "interview_questions.prompt",
+            InterviewQuestions,
             resume_text=cleaned_resume,
             job_description=cleaned_jd
-        )
-        
-        response = self.llm_service.chat_completion(prompt)
-        return InterviewQuestions(**response)
\ No newline at end of file
+        )
\ No newline at end of file
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import time
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import pandas as pd
+from pydantic import ValidationError
+from app.agents.ats_agent import ATSAgent
+from app.services.batch_backends import TERMINAL_STATUSES, batch_request, create_batch_backend
+from app.services.jd_registry import get_jd_registry
+from app.services.prompt_registry import get_prompt_registry
+from app.services.result_cache import ResultCache
+from app.models.schemas import ATSScreeningResult
+from app.utils.pdf_parser import PDFParser
+from app.utils.token_budget import TokenBudget, cached_prompt_tokens, get_token_usage
+from app.config import Config
+
+class BatchScreeningAgent:
+    # Headless screening of a resume directory through a provider batch API. The job directory holds the
+    # checkpoint (state.json), the request files, downloaded outputs and one results.jsonl row per resume,
+    # so running the same job again after a crash carries on from the step it stopped in.
+    def __init__(self, job_dir: str, backend=None, ats_agent: ATSAgent = None, prescreen: bool = None, on_progress: Callable[[str], None] = None):
+        self.job_dir = Path(job_dir)
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        self.backend = backend or create_batch_backend(root=str(self.job_dir / "local_backend"))
+        self.ats_agent = ats_agent or ATSAgent()
+        # Resumes are fitted to the batch model's window, which can differ from the interactive provider's
+        self.ats_agent.token_budget = TokenBudget(self.backend.model)
+        self.result_cache = self.ats_agent.result_cache
+        self.prescreen = Config.PRESCREEN_ENABLED if prescreen is None else prescreen
+        self.on_progress = on_progress or (lambda message: None)
+        self.state_path = self.job_dir / "state.json"
+        self.results_path = self.job_dir / "results.jsonl"
+    
+    def run(self, resume_dir: str, job_description: str, output_path: str, poll_seconds: float = None) -> Dict[str, int]:
+        state = self._load_state(job_description)
+        if not state['prepared']:
+            self._prepare(state, resume_dir, job_description)
+        self._submit(state)
+        self._wait(state, Config.BATCH_POLL_SECONDS if poll_seconds is None else poll_seconds)
+        return self._export(output_path)
+    
+    def _load_state(self, job_description: str) -> Dict[str, Any]:
+        jd_hash = hashlib.sha256(job_description.encode("utf-8")).hexdigest()
+        if self.state_path.exists():
+            state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            if state['jd_hash'] != jd_hash or state['model'] != self.backend.model:
+                raise ValueError(f"Job directory {self.job_dir} belongs to a different job description or model")
+            self.on_progress(f"Resuming job in {self.job_dir}")
+            return state
+        return {'jd_hash': jd_hash, 'model': self.backend.model, 'prepared': False, 'cache_keys': {}, 'batches': []}
+    
+    def _save_state(self, state: Dict[str, Any]):
+        # Written to a temporary file and renamed, so a crash never leaves a half-written checkpoint
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, self.state_path)
+    
+    @staticmethod
+    def _pdf_files(resume_dir: str) -> Iterator[BytesIO]:
+        # Read one at a time, so thousands of resumes never hold thousands of open files
+        for path in sorted(Path(resume_dir).glob("*.pdf")):
+            pdf_file = BytesIO(path.read_bytes())
+            pdf_file.name = path.name
+            yield pdf_file
+    
+    def _prepare(self, state: Dict[str, Any], resume_dir: str, job_description: str):
+        # Parse errors, pre-screen rejects and cached screenings are written straight to results.jsonl;
+        # everything else becomes a request line, split into files of at most BATCH_MAX_REQUESTS lines
+        jd = get_jd_registry().get(job_description, requirements=self.prescreen)
+        job_requirements = jd.requirements if self.prescreen else None
+        if self.prescreen and job_requirements is None:
+            self.on_progress("Could not extract the job requirements; screening every resume without the keyword pre-screen")
+        registry = get_prompt_registry()
+        requests: List[str] = []
+        cache_keys: Dict[str, str] = {}
+        
+        with open(self.results_path, "w", encoding="utf-8") as results:
+            for name, resume_text, error in PDFParser.extract_texts(self._pdf_files(resume_dir)):
+                if error:
+                    results.write(self._row(name, error=error))
+                    continue
+                if job_requirements is not None:
+                    rejected = self.ats_agent.prescreen(resume_text, job_requirements)
+                    if rejected is not None:
+                        results.write(self._row(name, result=rejected))
+                        continue
+                        
+                prompt_args = self.ats_agent.screening_args(resume_text, jd)
+                key = ResultCache.make_key("ats_screening.prompt", self.backend.model, Config.TEMPERATURE, **prompt_args)
+                cached = self.result_cache.get(key, ATSScreeningResult) if self.result_cache else None
+                if cached is not None:
+                    results.write(self._row(name, result=cached))
+                    continue
+                    
+                cache_keys[name] = key
+                prompt = registry.render("ats_screening.prompt", **prompt_args)
+                requests.append(json.dumps(batch_request(name, prompt, self.backend.model, Config.STRUCTURED_OUTPUT)) + "\n")
+                
+        state['cache_keys'] = cache_keys
+        state['batches'] = self._write_request_files(requests)
+        state['prepared'] = True
+        self._save_state(state)
+        self.on_progress(f"Prepared {len(requests)} request(s) in {len(state['batches'])} batch file(s)")
+    
+    def _write_request_files(self, requests: List[str]) -> List[Dict[str, Any]]:
+        batches = []
+        chunk: List[str] = []
+        size = 0
+        for line in requests + [None]:
+            line_size = len(line.encode("utf-8")) if line is not None else 0
+            if chunk and (line is None or len(chunk) >= Config.BATCH_MAX_REQUESTS or size + line_size > Config.BATCH_MAX_FILE_BYTES):
+                input_file = f"requests_{len(batches):04d}.jsonl"
+                (self.job_dir / input_file).write_text("".join(chunk), encoding="utf-8")
+                batches.append({
+                    'input': input_file,
+                    'custom_ids': [json.loads(request)['custom_id'] for request in chunk],
+                    'id': None,
+                    'status': 'pending',
+                    'collected': False
+                })
+                chunk, size = [], 0
+            if line is not None:
+                chunk.append(line)
+                size += line_size
+        return batches
+    
+    def _submit(self, state: Dict[str, Any]):
+        # The checkpoint is saved after every submission; a crash between the two resubmits that one file,
+        # and the duplicate rows collapse in the export
+        for batch in state['batches']:
+            if batch['id'] is None:
+                batch['id'] = self.backend.submit(str(self.job_dir / batch['input']))
+                batch['status'] = 'submitted'
+                self._save_state(state)
+                self.on_progress(f"Submitted {batch['input']} as {batch['id']}")
+    
+    def _wait(self, state: Dict[str, Any], poll_seconds: float):
+        while True:
+            for batch in [batch for batch in state['batches'] if not batch['collected']]:
+                info = self.backend.status(batch['id'])
+                if info['status'] != batch['status']:
+                    self.on_progress(f"{batch['id']}: {info['status']}")
+                batch['status'] = info['status']
+                if info['status'] in TERMINAL_STATUSES:
+                    self._collect(batch, info, state['cache_keys'])
+                    batch['collected'] = True
+                self._save_state(state)
+                
+            if all(batch['collected'] for batch in state['batches']):
+                return
+            time.sleep(poll_seconds)
+    
+    def _collect(self, batch: Dict[str, Any], info: Dict[str, Any], keys: Dict[str, str]):
+        # An expired or cancelled batch still returns what it finished; the rest are reported as failed
+        output_path = self.job_dir / f"output_{batch['id']}.jsonl"
+        self.backend.download(info, str(output_path))
+        seen = set()
+        
+        with open(output_path, encoding="utf-8") as output, open(self.results_path, "a", encoding="utf-8") as results:
+            for line in output:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                name = entry['custom_id']
+                seen.add(name)
+                result, error = self._parse_output(entry)
+                if result is not None and self.result_cache and name in keys:
+                    self.result_cache.set(keys[name], result)
+                results.write(self._row(name, result=result, error=error))
+                
+            for name in batch['custom_ids']:
+                if name not in seen:
+                    results.write(self._row(name, error=f"Batch {batch['id']} ended as {info['status']} without a result"))
+    
+    def _parse_output(self, entry: Dict[str, Any]):
+        response = entry.get('response') or {}
+        if entry.get('error') or response.get('status_code') != 200:
+            error = entry.get('error') or response.get('body', {}).get('error') or {}
+            return None, f"Batch request failed: {error.get('message', 'unknown error')}"
+            
+        body = response['body']
+        usage = body.get('usage') or {}
+        get_token_usage().record(self.backend.model, usage.get('prompt_tokens', 0), usage.get('completion_tokens', 0), cached_prompt_tokens(usage))
+        try:
+            return ATSScreeningResult(**json.loads(body['choices'][0]['message']['content'])), None
+        except (json.JSONDecodeError, ValidationError, TypeError) as e:
+            return None, f"Invalid JSON response: {str(e)}"
+    
+    @staticmethod
+    def _row(name: str, result: ATSScreeningResult = None, error: Optional[str] = None) -> str:
+        return json.dumps({'filename': name, 'result': result.model_dump() if result else None, 'error': error}) + "\n"
+    
+    def _export(self, output_path: str) -> Dict[str, int]:
+        # Later rows win, so a resubmitted or re-downloaded batch never produces duplicates
+        rows: Dict[str, Dict[str, Any]] = {}
+        with open(self.results_path, encoding="utf-8") as results:
+            for line in results:
+                if line.strip():
+                    row = json.loads(line)
+                    rows[row['filename']] = row
+                    
+        table = []
+        for name, row in rows.items():
+            record = {'filename': name, 'error': row['error']}
+            for field, value in (row['result'] or {}).items():
+                record[field] = "; ".join(value) if isinstance(value, list) else value
+            table.append(record)
+            
+        columns = ['filename', 'error'] + [field for field in ATSScreeningResult.model_fields]
+        df = pd.DataFrame(table, columns=columns).sort_values('overall_match_score', ascending=False, na_position='last')
+        if str(output_path).endswith(".parquet"):
+            df.to_parquet(output_path, index=False)
+        else:
+            df.to_csv(output_path, index=False)
+            
+        screened = [row for row in rows.values() if row['result']]
+        return {
+            'resumes': len(rows),
+            'screened': len(screened),
+            'shortlisted': sum(1 for row in screened if row['result']['final_decision'] == "SHORTLIST"),
+            'failed': len(rows) - len(screened)
+        }
\ No newline at end of file
@@ -0,0 +1,101 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from app.agents.ats_agent import ATSAgent
+from app.services.jd_registry import get_jd_registry
+from app.models.schemas import JobRequirements, ProcessedJobDescription
+from app.utils.pdf_parser import PDFParser
+from app.utils.token_budget import count_tokens
+from app.config import Config
+
+class BulkScreeningAgent:
+    def __init__(self, ats_agent: ATSAgent = None, max_concurrency: int = None, prescreen: bool = None, packed: bool = None):
+        self.ats_agent = ats_agent or ATSAgent()
+        self.max_concurrency = max(1, max_concurrency or Config.MAX_CONCURRENT_SCREENINGS)
+        self.prescreen = Config.PRESCREEN_ENABLED if prescreen is None else prescreen
+        self.packed = Config.PACKED_SCREENING if packed is None else packed
+    
+    def screen_resumes(self, resume_files: List[Any], job_description: str) -> Iterator[Dict[str, Any]]:
+        # Yields one entry per resume in completion order, so callers can stream progress.
+        # PDFs are parsed on a process pool and each one is screened as soon as its text is ready.
+        return self._run(PDFParser.extract_texts(resume_files), job_description)
+    
+    def screen_resume_texts(self, resumes: List[Tuple[str, str]], job_description: str) -> Iterator[Dict[str, Any]]:
+        # Same as screen_resumes for already-extracted (name, resume_text) pairs
+        return self._run(((name, resume_text, None) for name, resume_text in resumes), job_description)
+    
+    def _run(self, parsed: Iterable[Tuple[str, Optional[str], Optional[str]]], job_description: str) -> Iterator[Dict[str, Any]]:
+        # The JD is processed once per batch; its requirements feed the keyword pre-screen when enabled,
+        # and without them every resume goes to the LLM
+        jd = get_jd_registry().get(job_description, requirements=self.prescreen)
+        job_requirements = jd.requirements if self.prescreen else None
+        if self.packed:
+            yield from self._run_packed(parsed, jd, job_requirements)
+            return
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ats-screen") as executor:
+            futures = set()
+            for name, resume_text, error in parsed:
+                if error:
+                    yield {'filename': name, 'resume_text': None, 'result': None, 'error': error}
+                else:
+                    futures.add(executor.submit(self._screen_one, name, resume_text, jd, job_requirements))
+                
+                # Stream screenings that finished while later PDFs were still parsing
+                for future in [future for future in futures if future.done()]:
+                    futures.remove(future)
+                    yield future.result()
+            
+            for future in as_completed(futures):
+                yield future.result()
+    
+    def _run_packed(self, parsed: Iterable[Tuple[str, Optional[str], Optional[str]]], jd: ProcessedJobDescription, job_requirements: Optional[JobRequirements]) -> Iterator[Dict[str, Any]]:
+        # Resumes are grouped as they finish parsing, by raw token count, until the next one would overflow
+        # the pack's candidate or token limit; each full pack is screened while later PDFs keep parsing
+        max_candidates, max_tokens = self.ats_agent.pack_limits(jd)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ats-screen") as executor:
+            futures = set()
+            pack: List[Tuple[str, str]] = []
+            pack_tokens = 0
+            for name, resume_text, error in parsed:
+                if error:
+                    yield {'filename': name, 'resume_text': None, 'result': None, 'error': error}
+                else:
+                    tokens = count_tokens(resume_text, self.ats_agent.token_budget.model) + 10
+                    if pack and (len(pack) >= max_candidates or pack_tokens + tokens > max_tokens):
+                        futures.add(executor.submit(self._screen_pack, pack, jd, job_requirements))
+                        pack, pack_tokens = [], 0
+                    pack.append((name, resume_text))
+                    pack_tokens += tokens
+                    
+                for future in [future for future in futures if future.done()]:
+                    futures.remove(future)
+                    yield from future.result()
+                    
+            if pack:
+                futures.add(executor.submit(self._screen_pack, pack, jd, job_requirements))
+            for future in as_completed(futures):
+                yield from future.result()
+    
+    def _screen_pack(self, pack: List[Tuple[str, str]], jd: ProcessedJobDescription, job_requirements: Optional[JobRequirements]) -> List[Dict[str, Any]]:
+        # Candidates the packed answer left out or got wrong, and every candidate of a failed pack,
+        # fall back to their own screening call
+        results = {}
+        if len(pack) > 1:
+            try:
+                results = self.ats_agent.screen_pack([resume_text for _, resume_text in pack], jd, job_requirements)
+            except Exception:
+                results = {}
+        # Results come back by position in the pack, so uploads sharing a filename keep their own result
+        return [
+            {'filename': name, 'resume_text': resume_text, 'result': results[position], 'error': None} if position in results
+            else self._screen_one(name, resume_text, jd, job_requirements)
+            for position, (name, resume_text) in enumerate(pack)
+        ]
+    
+    def _screen_one(self, name: str, resume_text: str, job_description: ProcessedJobDescription, job_requirements: Optional[JobRequirements]) -> Dict[str, Any]:
+        # A failing resume is reported, never raised, so the rest of the batch keeps going
+        try:
+            result = self.ats_agent.screen_resume(resume_text, job_description, job_requirements)
+            return {'filename': name, 'resume_text': resume_text, 'result': result, 'error': None}
+        except Exception as e:
+            return {'filename': name, 'resume_text': resume_text, 'result': None, 'error': str(e)}
\ No newline at end of file
@@ -1,17 +1,9 @@
-from app.services.openai_service import OpenAIService
-from app.services.groq_service import GroqService
-from app.services.mock_openai_service import MockOpenAIService
+from app.services.llm_router import create_llm_service
 from app.models.schemas import ResumeData, JobRequirements, MatchingScore, ExplanationResult
-from app.config import Config
 
 class ExplanationAgent:
     def __init__(self):
-        if Config.DEMO_MODE:
-            self.llm_service = MockOpenAIService()
-        elif Config.USE_GROQ:
-            self.llm_service = GroqService()
-        else:
-            self.llm_service = OpenAIService()
+        self.llm_service = create_llm_service()
     
     def generate_explanation(self, resume_data: ResumeData, job_requirements: JobRequirements, matching_results: MatchingScore) -> ExplanationResult:
         prompt = self.llm_service.load_prompt(
@@ -21,5 +13,5 @@ class ExplanationAgent:
             matching_results=matching_results.model_dump()
         )
         
-        response = self.llm_service.chat_completion(prompt)
+        response = self.llm_service.chat_completion(prompt, response_model=ExplanationResult)
         return ExplanationResult(**response)
\ No newline at end of file
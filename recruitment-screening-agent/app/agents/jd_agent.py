@@ -1,22 +1,28 @@
-from app.services.openai_service import OpenAIService
-from app.services.groq_service import GroqService
-from app.services.mock_openai_service import MockOpenAIService
+from app.services.llm_router import cacheable, create_llm_service
+from app.services.result_cache import get_result_cache
 from app.models.schemas import JobRequirements
 from app.utils.text_cleaner import TextCleaner
 from app.config import Config
 
 class JDAgent:
     def __init__(self):
-        if Config.DEMO_MODE:
-            self.llm_service = MockOpenAIService()
-        elif Config.USE_GROQ:
-            self.llm_service = GroqService()
-        else:
-            self.llm_service = OpenAIService()
+        self.llm_service = create_llm_service()
         self.text_cleaner = TextCleaner()
+        self.result_cache = get_result_cache()
     
     def process_job_description(self, job_description: str) -> JobRequirements:
         cleaned_text = self.text_cleaner.clean_text(job_description)
+        key = None
+        if self.result_cache:
+            key = self.result_cache.make_key("jd_extraction.prompt", self.llm_service.model, Config.TEMPERATURE, job_description=cleaned_text)
+            cached = self.result_cache.get(key, JobRequirements)
+            if cached is not None:
+                return cached
+        
         prompt = self.llm_service.load_prompt("jd_extraction.prompt", job_description=cleaned_text)
-        response = self.llm_service.chat_completion(prompt)
-        return JobRequirements(**response)
\ No newline at end of file
+        response = self.llm_service.chat_completion(prompt, response_model=JobRequirements)
+        job_requirements = JobRequirements(**response)
+        
+        if key and cacheable(self.llm_service):
+            self.result_cache.set(key, job_requirements)
+        return job_requirements
\ No newline at end of file
@@ -1,27 +1,23 @@
-from app.services.openai_service import OpenAIService
-from app.services.groq_service import GroqService
-from app.services.mock_openai_service import MockOpenAIService
+from app.services.llm_router import create_llm_service
 from app.services.embedding_service import EmbeddingService
-from app.services.faiss_service import FAISSService
+from app.services.faiss_service import get_faiss_service
+from app.services.bm25_index import get_bm25_index
 from app.models.schemas import ResumeData, JobRequirements, MatchingScore
 from app.config import Config
+import numpy as np
+from typing import List
 
 class MatchingAgent:
     def __init__(self):
-        if Config.DEMO_MODE:
-            self.llm_service = MockOpenAIService()
-        elif Config.USE_GROQ:
-            self.llm_service = GroqService()
-        else:
-            self.llm_service = OpenAIService()
-        self.embedding_service = EmbeddingService()
-        self.faiss_service = FAISSService()
+        self.llm_service = create_llm_service()
+        self.bm25_index = get_bm25_index()
+        # Embeddings need OpenAI; demo, Groq and BM25-only setups never build the embedding path
+        self.uses_embeddings = not (Config.DEMO_MODE or Config.USE_GROQ or Config.RETRIEVAL_MODE == "bm25")
+        self.embedding_service = EmbeddingService() if self.uses_embeddings else None
+        self.faiss_service = get_faiss_service() if self.uses_embeddings else None
     
     def calculate_match_score(self, resume_data: ResumeData, job_requirements: JobRequirements) -> MatchingScore:
-        if not Config.DEMO_MODE and not Config.USE_GROQ:
-            semantic_score = self._calculate_semantic_similarity(resume_data, job_requirements)
-        else:
-            semantic_score = 0.8
+        semantic_score = self._calculate_semantic_similarity(resume_data, job_requirements)
         
         prompt = self.llm_service.load_prompt(
             "matching_reasoning.prompt",
@@ -29,17 +25,35 @@ class MatchingAgent:
             job_requirements=job_requirements.model_dump()
         )
         
-        response = self.llm_service.chat_completion(prompt)
-        if not Config.DEMO_MODE and not Config.USE_GROQ:
-            response['overall_score'] = (response['overall_score'] + semantic_score * 100) / 2
+        # Copied so the blend never touches a dict the service hands out again, such as the mock's canned answer
+        response = dict(self.llm_service.chat_completion(prompt, response_model=MatchingScore))
+        response['overall_score'] = (response['overall_score'] + semantic_score * 100) / 2
         
         return MatchingScore(**response)
     
+    def calculate_semantic_similarities(self, resumes: List[ResumeData], job_requirements: JobRequirements) -> List[float]:
+        # Normalized BM25 against the talent pool's corpus statistics is free and works on every backend. With
+        # OpenAI embeddings available the job and every resume are embedded in one batched, cached request,
+        # and the scores follow RETRIEVAL_MODE like talent pool search does.
+        job_text = self._job_text(job_requirements)
+        resume_texts = [self._resume_text(resume_data) for resume_data in resumes]
+        lexical = np.asarray(self.bm25_index.score_texts(job_text, resume_texts))
+        if not self.uses_embeddings:
+            return lexical.tolist()
+            
+        embeddings = self.embedding_service.get_embeddings([job_text] + resume_texts)
+        dense, _ = self.faiss_service.score_many(embeddings[0], embeddings[1:])
+        if Config.RETRIEVAL_MODE == "faiss":
+            return dense.tolist()
+        return (Config.HYBRID_ALPHA * dense + (1 - Config.HYBRID_ALPHA) * lexical).tolist()
+    
     def _calculate_semantic_similarity(self, resume_data: ResumeData, job_requirements: JobRequirements) -> float:
-        resume_text = f"{resume_data.summary} {' '.join(resume_data.skills)} {resume_data.experience}"
-        job_text = f"{job_requirements.job_summary} {' '.join(job_requirements.required_skills)} {' '.join(job_requirements.preferred_skills)}"
-        
-        resume_embedding = self.embedding_service.get_embedding(resume_text)
-        job_embedding = self.embedding_service.get_embedding(job_text)
-        
-        return self.faiss_service.similarity_score(resume_embedding, job_embedding)
\ No newline at end of file
+        return self.calculate_semantic_similarities([resume_data], job_requirements)[0]
+    
+    @staticmethod
+    def _resume_text(resume_data: ResumeData) -> str:
+        return f"{resume_data.summary} {' '.join(resume_data.skills)} {resume_data.experience}"
+    
+    @staticmethod
+    def _job_text(job_requirements: JobRequirements) -> str:
+        return f"{job_requirements.job_summary} {' '.join(job_requirements.required_skills)} {' '.join(job_requirements.preferred_skills)}"
\ No newline at end of file
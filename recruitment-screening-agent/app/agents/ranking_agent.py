@@ -0,0 +1,92 @@
+import re
+from typing import Any, Dict, List, Union
+from app.services.llm_router import create_llm_service
+from app.services.jd_registry import get_jd_registry
+from app.models.schemas import ProcessedJobDescription
+from app.utils.text_cleaner import TextCleaner
+from app.utils.token_budget import TokenBudget, count_tokens, truncate_tokens
+from app.config import Config
+
+class RankingAgent:
+    # Listwise reranking of the top of a screened list, with RankGPT-style sliding windows. Results are ordered by
+    # overall_match_score first; the top_k are then walked back to front in windows of `window` candidates moving
+    # `step` at a time, and the LLM orders each window. A pass costs ceil((top_k - window) / step) + 1 calls and
+    # carries the best candidate of the top_k to the top; everything below top_k keeps its score order.
+    def __init__(self, llm_service=None, window: int = None, step: int = None, passes: int = None):
+        self.llm_service = llm_service or create_llm_service()
+        self.window = max(2, window or Config.RANKING_WINDOW)
+        self.step = max(1, min(step or Config.RANKING_STEP, self.window - 1))
+        self.passes = max(1, passes or Config.RANKING_PASSES)
+        self.text_cleaner = TextCleaner()
+        self.token_budget = TokenBudget(self.llm_service.model)
+        self.calls = 0
+    
+    def rerank(self, results: List[Dict[str, Any]], job_description: Union[str, ProcessedJobDescription], top_k: int = None) -> List[Dict[str, Any]]:
+        # Takes bulk screening entries ({'filename', 'resume_text', 'result'}) and returns them best first.
+        # Reranked entries gain 'llm_rank' and the model's 'rank_reason'.
+        ordered = sorted(results, key=lambda data: data['result'].overall_match_score, reverse=True)
+        top_k = min(len(ordered), top_k or Config.RANKING_TOP_K)
+        if top_k < 2:
+            return ordered
+            
+        cleaned_jd = job_description.cleaned_text if isinstance(job_description, ProcessedJobDescription) else get_jd_registry().get(job_description).cleaned_text
+        head = [dict(data) for data in ordered[:top_k]]
+        for _ in range(self.passes):
+            start = max(0, top_k - self.window)
+            while True:
+                head[start:start + self.window] = self._rank_window(head[start:start + self.window], cleaned_jd)
+                if start == 0:
+                    break
+                start = max(0, start - self.step)
+                
+        for rank, data in enumerate(head, start=1):
+            data['llm_rank'] = rank
+        return head + ordered[top_k:]
+    
+    def _rank_window(self, window: List[Dict[str, Any]], cleaned_jd: str) -> List[Dict[str, Any]]:
+        # A window the LLM cannot rank keeps its current order
+        ids = {f"C{index}": data for index, data in enumerate(window, start=1)}
+        header = count_tokens(self.llm_service.load_prompt("candidate_ranking.prompt", resume_list="", job_description=cleaned_jd), self.llm_service.model)
+        per_candidate = (self.token_budget.prompt_budget - header) // len(ids)
+        resume_list = "\n\n".join(self._describe(candidate_id, data, per_candidate) for candidate_id, data in ids.items())
+        
+        prompt = self.llm_service.load_prompt("candidate_ranking.prompt", resume_list=resume_list, job_description=cleaned_jd)
+        self.calls += 1
+        try:
+            response = self.llm_service.chat_completion(prompt)
+        except Exception:
+            return window
+            
+        order = []
+        for entry in self._entries(response):
+            match = re.search(r"C\d+", str(entry.get('name', '')))
+            if match and match.group(0) in ids and match.group(0) not in order:
+                order.append(match.group(0))
+                ids[match.group(0)]['rank_reason'] = entry.get('reason')
+        order += [candidate_id for candidate_id in ids if candidate_id not in order]
+        return [ids[candidate_id] for candidate_id in order]
+    
+    @staticmethod
+    def _entries(response: Any) -> List[Dict[str, Any]]:
+        # The prompt asks for an array; a model that wraps it in an object still counts. Entries are taken
+        # in rank order when the ranks are numbers and in listed order otherwise.
+        if isinstance(response, dict):
+            response = next((value for value in response.values() if isinstance(value, list)), [])
+        entries = [entry for entry in response if isinstance(entry, dict)] if isinstance(response, list) else []
+        if all(isinstance(entry.get('rank'), (int, float)) for entry in entries):
+            entries.sort(key=lambda entry: entry['rank'])
+        return entries
+    
+    def _describe(self, candidate_id: str, data: Dict[str, Any], max_tokens: int) -> str:
+        # The screening summary goes first so a resume cut to fit the window still leaves the essentials
+        result = data['result']
+        summary = (
+            f"### Candidate {candidate_id}\n"
+            f"Screening score: {result.overall_match_score:.1f} (technical {result.technical_skill_match:.1f}, "
+            f"projects {result.project_relevance_score:.1f}, experience {result.experience_score:.1f})\n"
+            f"Matched skills: {', '.join(result.matched_skills) or 'none'}\n"
+            f"Missing critical skills: {', '.join(result.missing_critical_skills) or 'none'}\n"
+            "Resume:\n"
+        )
+        resume_text = self.text_cleaner.clean_text(data.get('resume_text') or "")
+        return summary + truncate_tokens(resume_text, max_tokens - count_tokens(summary, self.llm_service.model), self.llm_service.model)
\ No newline at end of file
@@ -1,22 +1,44 @@
-from app.services.openai_service import OpenAIService
-from app.services.groq_service import GroqService
-from app.services.mock_openai_service import MockOpenAIService
+from app.services.llm_router import cacheable, create_llm_service
+from app.services.result_cache import get_result_cache
 from app.models.schemas import ResumeData
 from app.utils.text_cleaner import TextCleaner
+from app.utils.token_budget import TokenBudget, count_tokens
 from app.config import Config
 
 class ResumeAgent:
     def __init__(self):
-        if Config.DEMO_MODE:
-            self.llm_service = MockOpenAIService()
-        elif Config.USE_GROQ:
-            self.llm_service = GroqService()
-        else:
-            self.llm_service = OpenAIService()
+        self.llm_service = create_llm_service()
         self.text_cleaner = TextCleaner()
+        self.result_cache = get_result_cache()
+        self.token_budget = TokenBudget(self.llm_service.model)
     
     def process_resume(self, resume_text: str) -> ResumeData:
-        cleaned_text = self.text_cleaner.clean_text(resume_text)
+        # Compressed once per cleaned resume content; repeats are served from the result cache
+        reserved = count_tokens(self.llm_service.load_prompt("resume_compression.prompt", resume_text=""), self.llm_service.model)
+        cleaned_text = self.text_cleaner.clean_text(self.token_budget.fit_resume(resume_text, reserved))
+        key = None
+        if self.result_cache:
+            key = self.result_cache.make_key("resume_compression.prompt", self.llm_service.model, Config.TEMPERATURE, resume_text=cleaned_text)
+            cached = self.result_cache.get(key, ResumeData)
+            if cached is not None:
+                return cached
+        
         prompt = self.llm_service.load_prompt("resume_compression.prompt", resume_text=cleaned_text)
-        response = self.llm_service.chat_completion(prompt)
-        return ResumeData(**response)
\ No newline at end of file
+        response = self.llm_service.chat_completion(prompt, response_model=ResumeData)
+        resume_data = ResumeData(**response)
+        
+        if key and cacheable(self.llm_service):
+            self.result_cache.set(key, resume_data)
+        return resume_data
+    
+    def compact_text(self, resume_text: str) -> str:
+        return self.render(self.process_resume(resume_text))
+    
+    @staticmethod
+    def render(resume_data: ResumeData) -> str:
+        return (
+            f"Summary: {resume_data.summary}\n"
+            f"Skills: {', '.join(resume_data.skills)}\n"
+            f"Experience: {resume_data.experience}\n"
+            f"Education: {resume_data.education}"
+        )
\ No newline at end of file
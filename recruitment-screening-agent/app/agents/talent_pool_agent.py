@@ -0,0 +1,112 @@
+import heapq
+import numpy as np
+from typing import Any, Dict, Iterator, List, Tuple
+from app.agents.ats_agent import ATSAgent
+from app.agents.bulk_screening_agent import BulkScreeningAgent
+from app.services.embedding_service import EmbeddingService
+from app.services.faiss_service import get_faiss_service
+from app.services.candidate_store import get_candidate_store
+from app.services.bm25_index import get_bm25_index
+from app.services.jd_registry import get_jd_registry
+from app.utils.text_cleaner import TextCleaner
+from app.config import Config
+
+class TalentPoolAgent:
+    # Retrieve-then-rerank over previously stored resumes: a top-k lookup, then the full LLM screening only on
+    # that shortlist. Retrieval is FAISS over one JD embedding, the local BM25 index (no API call at all), or
+    # a hybrid of the two.
+    def __init__(self, ats_agent: ATSAgent = None, max_concurrency: int = None, prescreen: bool = None, packed: bool = None, retrieval_mode: str = None):
+        self.ats_agent = ats_agent or ATSAgent()
+        self.bulk_agent = BulkScreeningAgent(self.ats_agent, max_concurrency=max_concurrency, prescreen=prescreen, packed=packed)
+        self.store = get_candidate_store()
+        self.bm25_index = get_bm25_index()
+        self.text_cleaner = TextCleaner()
+        self.retrieval_mode = (retrieval_mode or Config.RETRIEVAL_MODE).lower()
+        if self.retrieval_mode not in ("faiss", "bm25", "hybrid"):
+            raise ValueError(f"Unknown retrieval mode: {self.retrieval_mode}")
+        # The embedding path is only built when retrieval uses it, so BM25 alone needs no OpenAI key
+        self.embedding_service = EmbeddingService() if self.retrieval_mode != "bm25" else None
+        self.faiss_service = get_faiss_service() if self.retrieval_mode != "bm25" else None
+        # Picks up candidates stored before the BM25 index existed
+        self.bm25_index.sync(self.store)
+    
+    def add_candidates(self, resume_texts: List[str], names: List[str]) -> List[int]:
+        cleaned = [self.text_cleaner.clean_text(text) for text in resume_texts]
+        
+        # Resumes already in the pool, or repeated in this batch, keep a single id
+        ids = [self.store.find_by_text(text) for text in cleaned]
+        first_row = {}
+        for i, text in enumerate(cleaned):
+            if ids[i] is None:
+                first_row.setdefault(text, i)
+        
+        new_rows = list(first_row.values())
+        if new_rows:
+            texts, new_names = [cleaned[i] for i in new_rows], [names[i] for i in new_rows]
+            if self.faiss_service:
+                new_ids = self.faiss_service.add_vectors(self.embedding_service.get_embeddings(texts), texts, new_names)
+            else:
+                # Stored without a vector; the next FAISS or hybrid search embeds them before querying
+                new_ids = self.store.add_many(texts, new_names)
+            self.bm25_index.add(new_ids, texts)
+            new_id_by_text = {cleaned[i]: candidate_id for i, candidate_id in zip(new_rows, new_ids)}
+            ids = [candidate_id if candidate_id is not None else new_id_by_text[text] for candidate_id, text in zip(ids, cleaned)]
+        return ids
+    
+    def pool_size(self) -> int:
+        return self.store.count()
+    
+    def search(self, job_description: str, k: int = None) -> List[Dict[str, Any]]:
+        k = k or Config.TALENT_POOL_TOP_K
+        if self.faiss_service:
+            self.faiss_service.sync(self.embedding_service.get_embeddings)
+        if self.retrieval_mode == "bm25":
+            hits = self.bm25_index.query(get_jd_registry().get(job_description).cleaned_text, k)
+        elif self.retrieval_mode == "faiss":
+            hits = self.faiss_service.search_ids(self._job_embedding(job_description), k)
+        else:
+            hits = self._hybrid_search(job_description, k)
+            
+        candidates = self.store.get_many([candidate_id for candidate_id, _ in hits])
+        return [
+            {
+                'candidate_id': candidate_id,
+                'filename': f"{candidates[candidate_id]['name'] or 'Candidate'} (#{candidate_id})",
+                'resume_text': candidates[candidate_id]['text'],
+                'retrieval_score': score
+            }
+            for candidate_id, score in hits if candidate_id in candidates
+        ]
+    
+    def _hybrid_search(self, job_description: str, k: int) -> List[Tuple[int, float]]:
+        # Both retrievers return a wider list and the union is ranked by a weighted sum of the embedding
+        # similarity and the normalized BM25 score. A candidate missing from one full list is given that
+        # list's lowest score, the most it could have had.
+        pool = k * Config.HYBRID_CANDIDATES
+        jd = get_jd_registry().get(job_description, embedding=True)
+        dense = self.faiss_service.search_ids(np.asarray(jd.embedding, dtype=np.float32), pool)
+        lexical = self.bm25_index.query(jd.cleaned_text, pool)
+        
+        dense_scores, lexical_scores = dict(dense), dict(lexical)
+        dense_floor = min(dense_scores.values()) if len(dense) == pool else 0.0
+        lexical_floor = min(lexical_scores.values()) if len(lexical) == pool else 0.0
+        fused = {
+            candidate_id: Config.HYBRID_ALPHA * dense_scores.get(candidate_id, dense_floor) + (1 - Config.HYBRID_ALPHA) * lexical_scores.get(candidate_id, lexical_floor)
+            for candidate_id in dense_scores.keys() | lexical_scores.keys()
+        }
+        return heapq.nlargest(k, fused.items(), key=lambda item: item[1])
+    
+    @staticmethod
+    def _job_embedding(job_description: str) -> np.ndarray:
+        return np.asarray(get_jd_registry().get(job_description, embedding=True).embedding, dtype=np.float32)
+    
+    def search_and_screen(self, job_description: str, k: int = None) -> Iterator[Dict[str, Any]]:
+        shortlist = self.search(job_description, k)
+        by_name = {candidate['filename']: candidate for candidate in shortlist}
+        
+        resumes = [(candidate['filename'], candidate['resume_text']) for candidate in shortlist]
+        for data in self.bulk_agent.screen_resume_texts(resumes, job_description):
+            candidate = by_name[data['filename']]
+            data['candidate_id'] = candidate['candidate_id']
+            data['retrieval_score'] = candidate['retrieval_score']
+            yield data
\ No newline at end of file
@@ -0,0 +1,37 @@
+import argparse
+from pathlib import Path
+from app.agents.batch_screening_agent import BatchScreeningAgent
+from app.services.batch_backends import create_batch_backend
+from app.utils.token_budget import get_token_usage
+
+# Overnight screening of a resume directory through the provider batch API:
+#   python -m app.batch_screening --resumes resumes/ --jd job.txt --out results.parquet
+# Re-running the same command resumes the job from its checkpoint in --job-dir, which defaults to a
+# <out>.job directory beside the results file.
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Screen a directory of PDF resumes against a job description with a batch API")
+    parser.add_argument("--resumes", required=True, help="directory of PDF resumes")
+    parser.add_argument("--jd", required=True, help="text file with the job description")
+    parser.add_argument("--out", required=True, help="results file; a .parquet name writes Parquet, anything else CSV")
+    parser.add_argument("--job-dir", help="checkpoint directory, reused to resume a job (default: <out>.job)")
+    parser.add_argument("--backend", choices=["openai", "local"], help="batch backend (default: BATCH_BACKEND, local in demo mode)")
+    parser.add_argument("--poll-seconds", type=float, help="seconds between status polls (default: BATCH_POLL_SECONDS)")
+    parser.add_argument("--prescreen", action="store_true", default=None, help="reject resumes that miss most required skills without an LLM call")
+    args = parser.parse_args(argv)
+    
+    job_dir = Path(args.job_dir or f"{args.out}.job")
+    backend = create_batch_backend(args.backend, root=str(job_dir / "local_backend"))
+    agent = BatchScreeningAgent(str(job_dir), backend=backend, prescreen=args.prescreen, on_progress=print)
+    job_description = Path(args.jd).read_text(encoding="utf-8")
+    
+    summary = agent.run(args.resumes, job_description, args.out, poll_seconds=args.poll_seconds)
+    print(
+        f"Screened {summary['screened']} of {summary['resumes']} resume(s): "
+        f"{summary['shortlisted']} shortlisted, {summary['failed']} failed. Results written to {args.out}"
+    )
+    for model, stats in get_token_usage().stats().items():
+        print(f"{model}: {stats['prompt_tokens']:,} prompt tokens ({stats['cached_tokens']:,} cached), {stats['completion_tokens']:,} completion tokens over {stats['calls']} request(s)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
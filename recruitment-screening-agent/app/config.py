@@ -10,9 +10,107 @@ class Config:
     
     OPENAI_MODEL = "gpt-3.5-turbo"
     GROQ_MODEL = "llama-3.3-70b-versatile"
+    OPENAI_SMALL_MODEL = os.getenv("OPENAI_SMALL_MODEL", "gpt-4o-mini")
+    GROQ_SMALL_MODEL = os.getenv("GROQ_SMALL_MODEL", "llama-3.1-8b-instant")
     
     EMBEDDING_MODEL = "text-embedding-ada-002"
+    EMBEDDING_BATCH_SIZE = 100
     MAX_TOKENS = 2000
     TEMPERATURE = 0.1
+    MODEL_CONTEXT_WINDOWS = {"gpt-3.5-turbo": 16385, "llama-3.3-70b-versatile": 128000, "gpt-4o-mini": 128000, "llama-3.1-8b-instant": 128000}
+    DEFAULT_CONTEXT_WINDOW = 8192
+    PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))  # 0 uses the model window minus MAX_TOKENS
+    CHARS_PER_TOKEN = 4
+    RESUME_HEADER_MAX_TOKENS = 100
+    MIN_SECTION_TOKENS = 50
     FAISS_INDEX_PATH = "faiss_index.bin"
-    DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"
\ No newline at end of file
+    FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")  # flat, ivf_flat, ivf_pq or hnsw
+    FAISS_TRAIN_THRESHOLD = int(os.getenv("FAISS_TRAIN_THRESHOLD", "50000"))
+    FAISS_MAX_TRAIN_SAMPLE = 100000
+    FAISS_NLIST = 1024
+    FAISS_NPROBE = 16
+    FAISS_PQ_M = 64
+    FAISS_HNSW_M = 32
+    FAISS_HNSW_EF_SEARCH = 64
+    FAISS_SNAPSHOT_INTERVAL = 1000
+    CANDIDATE_STORE_PATH = os.getenv("CANDIDATE_STORE_PATH", "candidates.db")
+    TALENT_POOL_TOP_K = 10
+    DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"
+    BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "bm25_index.db")
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    # faiss, bm25 or hybrid; embeddings need an OpenAI key, so without one retrieval defaults to BM25 alone
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid" if OPENAI_API_KEY or DEMO_MODE else "bm25")
+    HYBRID_ALPHA = float(os.getenv("HYBRID_ALPHA", "0.5"))  # weight of embedding similarity; BM25 gets the rest
+    HYBRID_CANDIDATES = 3  # each retriever returns k * HYBRID_CANDIDATES hits before fusion
+    
+    MAX_CONCURRENT_SCREENINGS = int(os.getenv("MAX_CONCURRENT_SCREENINGS", "8"))
+    PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PDF_PARSE_TIMEOUT = float(os.getenv("PDF_PARSE_TIMEOUT", "20"))
+    PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "30"))
+    PDF_MAX_BYTES = int(os.getenv("PDF_MAX_BYTES", str(10 * 1024 * 1024)))
+    PARSED_TEXT_CACHE_SIZE = 512
+    PARSED_TEXT_CACHE_DIR = os.getenv("PARSED_TEXT_CACHE_DIR")  # unset keeps the cache in memory only
+    PARSED_TEXT_CACHE_DISK_SIZE = 5000
+    PRESCREEN_ENABLED = os.getenv("PRESCREEN_ENABLED", "false").lower() == "true"
+    PRESCREEN_MIN_SKILL_MATCH = float(os.getenv("PRESCREEN_MIN_SKILL_MATCH", "0.3"))
+    JD_REGISTRY_SIZE = 64
+    
+    BATCH_BACKEND = os.getenv("BATCH_BACKEND", "openai")  # openai or local (file-based stand-in, always used in demo mode)
+    BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "5000"))  # per submitted batch file
+    BATCH_MAX_FILE_BYTES = 100 * 1024 * 1024
+    BATCH_COMPLETION_WINDOW = "24h"
+    BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "60"))
+    USE_COMPRESSED_RESUME = os.getenv("USE_COMPRESSED_RESUME", "false").lower() == "true"
+    CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+    SHORTLIST_SCORE_THRESHOLD = float(os.getenv("SHORTLIST_SCORE_THRESHOLD", "70"))
+    CASCADE_UNCERTAINTY_BAND = float(os.getenv("CASCADE_UNCERTAINTY_BAND", "10"))  # small-model scores within this of the threshold escalate
+    PACKED_SCREENING = os.getenv("PACKED_SCREENING", "false").lower() == "true"
+    PACKED_MAX_CANDIDATES = int(os.getenv("PACKED_MAX_CANDIDATES", "8"))
+    PACKED_TOKENS_PER_RESULT = 400  # completion tokens reserved per candidate, so MAX_TOKENS also caps a pack
+    RANKING_ENABLED = os.getenv("RANKING_ENABLED", "false").lower() == "true"
+    RANKING_TOP_K = int(os.getenv("RANKING_TOP_K", "10"))
+    RANKING_WINDOW = 5
+    RANKING_STEP = 2
+    RANKING_PASSES = 1
+    
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_TIMEOUT = 60.0
+    
+    OPENAI_RPM = int(os.getenv("OPENAI_RPM", "3500"))
+    OPENAI_TPM = int(os.getenv("OPENAI_TPM", "90000"))
+    GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+    GROQ_TPM = int(os.getenv("GROQ_TPM", "12000"))
+    EMBEDDING_RPM = int(os.getenv("EMBEDDING_RPM", "3000"))
+    EMBEDDING_TPM = int(os.getenv("EMBEDDING_TPM", "1000000"))
+    RATE_LIMITS = {
+        "openai": (OPENAI_RPM, OPENAI_TPM),
+        "groq": (GROQ_RPM, GROQ_TPM),
+        "openai-embeddings": (EMBEDDING_RPM, EMBEDDING_TPM),
+    }
+    MODEL_RATE_LIMITS = {}  # model -> (rpm, tpm) where a model's quota differs from its provider default
+    RATE_LIMIT_MAX_CONCURRENCY = int(os.getenv("RATE_LIMIT_MAX_CONCURRENCY", "32"))
+    
+    LLM_ROUTING_ENABLED = os.getenv("LLM_ROUTING_ENABLED", "false").lower() == "true"  # needs both API keys
+    ROUTER_WINDOW = 50
+    ROUTER_MIN_SAMPLES = 5
+    ROUTER_ERROR_RATE_THRESHOLD = 0.5
+    ROUTER_COOLDOWN_SECONDS = 30
+    ROUTER_PROVIDER_RETRIES = 1  # failover replaces same-provider retries
+    ROUTER_HEDGE_ENABLED = os.getenv("ROUTER_HEDGE_ENABLED", "false").lower() == "true"
+    ROUTER_HEDGE_AFTER_SECONDS = float(os.getenv("ROUTER_HEDGE_AFTER_SECONDS", "0"))  # 0 hedges after the primary's p95
+    ROUTER_HEDGE_DEFAULT_SECONDS = 10.0
+    ROUTER_HEDGE_WORKERS = 32
+    
+    STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "true").lower() == "true"  # provider JSON mode for typed results
+    STRUCTURED_REPAIR_ATTEMPTS = 1
+    STRUCTURED_REPAIR_MAX_CHARS = 4000
+    
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH", "ats_result_cache.db")
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+    RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    
+    EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db")
\ No newline at end of file
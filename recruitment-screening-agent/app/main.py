@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
-from app.utils.pdf_parser import PDFParser
 from app.agents.ats_agent import ATSAgent
+from app.agents.bulk_screening_agent import BulkScreeningAgent
+from app.agents.ranking_agent import RankingAgent
+from app.agents.talent_pool_agent import TalentPoolAgent
+from app.models.schemas import ATSScreeningResult
+from app.services.jd_registry import get_jd_registry
+from app.utils.pdf_parser import PDFParser
+from app.utils.token_budget import get_token_usage
 from app.config import Config
-import time
 
 st.set_page_config(page_title="AI ATS Recruitment", page_icon="🎯", layout="wide", initial_sidebar_state="expanded")
 
@@ -67,10 +72,13 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def process_resume(resume_file, job_description, ats_agent):
-    resume_text = PDFParser.extract_text(resume_file)
-    result = ats_agent.screen_resume(resume_text, job_description)
-    return {'filename': resume_file.name, 'result': result}
+# Single-resume extras, all answered by one ATSAgent.analyze_full call
+EXTRA_ANALYSES = {
+    "ATS Format Scan": "ats_scan",
+    "Skill Gaps": "skill_gaps",
+    "Candidate Summary": "summary",
+    "Interview Questions": "interview_questions"
+}
 
 def main():
     st.markdown('<h1 class="main-header">🎯 AI-Powered ATS Recruitment System</h1>', unsafe_allow_html=True)
@@ -91,142 +99,332 @@ def main():
         st.markdown("✅ SHORTLIST/REJECT Decision")
         st.markdown("✅ Bulk Processing (50)")
         st.markdown("✅ Export Rankings")
+        
+        st.markdown("---")
+        max_concurrency = st.slider("⚡ Parallel Screenings", min_value=1, max_value=20, value=Config.MAX_CONCURRENT_SCREENINGS)
+        prescreen = st.checkbox("🧹 Keyword Pre-Screen", value=Config.PRESCREEN_ENABLED, help="Auto-reject resumes missing most required skills before any LLM call")
+        compress = st.checkbox("🗜️ Compressed Resume Prompts", value=Config.USE_COMPRESSED_RESUME, help="Send a cached compact summary of each resume to the LLM instead of its full text")
+        packed = st.checkbox("📦 Packed Bulk Screening", value=Config.PACKED_SCREENING, help="Screen several short resumes per LLM call, sharing one copy of the job description")
+        rerank = st.checkbox("🏆 LLM Rerank Top Candidates", value=Config.RANKING_ENABLED, help=f"Reorder the top {Config.RANKING_TOP_K} bulk results by comparing candidates side by side in small windows")
+        cascade = st.checkbox("🪜 Model Cascade", value=Config.CASCADE_ENABLED, help=f"Screen with a small model first and re-screen only scores within {Config.CASCADE_UNCERTAINTY_BAND:g} points of {Config.SHORTLIST_SCORE_THRESHOLD:g} with the large model")
     
-    mode = st.radio("📋 Select Mode", ["Single Resume", "Bulk Upload (Up to 50)"], horizontal=True)
+    mode = st.radio("📋 Select Mode", ["Single Resume", "Bulk Upload (Up to 50)", "Talent Pool Search"], horizontal=True)
     
     col1, col2 = st.columns([1, 1])
     
+    resume_files = []
+    save_to_pool = False
+    extra_analyses = []
     with col1:
-        st.markdown("### 📄 Resume Upload")
-        if mode == "Single Resume":
-            resume_files = st.file_uploader("Upload Resume PDF", type=['pdf'], accept_multiple_files=False)
-            resume_files = [resume_files] if resume_files else []
+        if mode == "Talent Pool Search":
+            st.markdown("### 🗂️ Talent Pool")
+            st.caption("Find the best stored candidates for a new role: retrieve the top matches, then run the full ATS screening on that shortlist only.")
+            top_k = st.number_input("Candidates to screen", min_value=1, max_value=100, value=Config.TALENT_POOL_TOP_K)
+            retrieval_modes = {"Hybrid (BM25 + embeddings)": "hybrid", "BM25 keywords (no API call)": "bm25", "Embeddings (FAISS)": "faiss"}
+            default_mode = list(retrieval_modes.values()).index(Config.RETRIEVAL_MODE) if Config.RETRIEVAL_MODE in retrieval_modes.values() else 0
+            retrieval_mode = retrieval_modes[st.selectbox("Retrieval", list(retrieval_modes), index=default_mode)]
         else:
-            resume_files = st.file_uploader("Upload up to 50 Resumes", type=['pdf'], accept_multiple_files=True)
-            if len(resume_files) > 50:
-                st.error("⚠️ Maximum 50 resumes")
-                resume_files = resume_files[:50]
-            if resume_files:
-                st.success(f"✅ {len(resume_files)} resume(s) uploaded")
+            st.markdown("### 📄 Resume Upload")
+            if mode == "Single Resume":
+                resume_files = st.file_uploader("Upload Resume PDF", type=['pdf'], accept_multiple_files=False)
+                resume_files = [resume_files] if resume_files else []
+                extra_analyses = st.multiselect("🧾 Additional Analyses", list(EXTRA_ANALYSES), help="Run the selected analyses together in one extra LLM call")
+            else:
+                resume_files = st.file_uploader("Upload up to 50 Resumes", type=['pdf'], accept_multiple_files=True)
+                if len(resume_files) > 50:
+                    st.error("⚠️ Maximum 50 resumes")
+                    resume_files = resume_files[:50]
+                if resume_files:
+                    st.success(f"✅ {len(resume_files)} resume(s) uploaded")
+                save_to_pool = st.checkbox("💾 Save screened resumes to talent pool")
     
     with col2:
         st.markdown("### 📋 Job Description")
         job_description = st.text_area("Enter detailed job requirements", height=200, placeholder="Required skills, experience, education...")
     
     if st.button("🚀 Start ATS Screening", type="primary"):
+        if mode == "Talent Pool Search":
+            run_talent_pool_search(job_description, top_k, max_concurrency, prescreen, compress, cascade, packed, rerank, retrieval_mode)
+            return
+        
         if not resume_files or not job_description.strip():
             st.error("❌ Provide resume(s) and job description")
             return
         
+        usage_before = get_token_usage().stats()
         try:
             with st.spinner("🔧 Initializing ATS Agent..."):
-                ats_agent = ATSAgent()
+                ats_agent = ATSAgent(use_compressed_resume=compress, cascade=cascade)
             
             results = []
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            for idx, resume_file in enumerate(resume_files):
-                status_text.text(f"🔍 Screening {resume_file.name} ({idx+1}/{len(resume_files)})...")
-                result = process_resume(resume_file, job_description, ats_agent)
-                results.append(result)
-                progress_bar.progress((idx + 1) / len(resume_files))
-                time.sleep(0.1)
+            failures = []
+            if mode == "Single Resume":
+                data = stream_single_result(ats_agent, resume_files[0], job_description, prescreen)
+                (failures if data['error'] else results).append(data)
+            else:
+                bulk_agent = BulkScreeningAgent(ats_agent, max_concurrency=max_concurrency, prescreen=prescreen, packed=packed)
+                progress_bar = st.progress(0)
+                status_text = st.empty()
+                status_text.text(f"🔍 Screening {len(resume_files)} resume(s)...")
+                live_table = st.empty()
+                
+                for done, data in enumerate(bulk_agent.screen_resumes(resume_files, job_description), start=1):
+                    if data['error']:
+                        failures.append(data)
+                    else:
+                        results.append(data)
+                    status_text.text(f"🔍 Screened {data['filename']} ({done}/{len(resume_files)})...")
+                    progress_bar.progress(done / len(resume_files))
+                    if results:
+                        live_table.dataframe(build_results_table(results), use_container_width=True, hide_index=True)
+                
+                progress_bar.empty()
+                status_text.empty()
+                live_table.empty()
             
-            progress_bar.empty()
-            status_text.empty()
+            for data in failures:
+                st.warning(f"⚠️ Could not screen {data['filename']}: {data['error']}")
+            if not results:
+                st.error("❌ No resumes could be screened")
+                return
             st.success(f"✅ Screening completed for {len(results)} candidate(s)!")
+            if ats_agent.result_cache:
+                cache_stats = ats_agent.result_cache.stats()
+                st.caption(f"♻️ Result cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+            token_stats = get_token_usage().since(usage_before)
+            if token_stats:
+                st.caption("🔢 Prompt tokens: " + ", ".join(format_token_usage(model, stats) for model, stats in token_stats.items()))
+            if cascade:
+                small_tier = sum(1 for data in results if data['result'].decided_by == "llm-small")
+                large_tier = sum(1 for data in results if data['result'].decided_by == "llm-large")
+                st.caption(f"🪜 Model cascade: {small_tier} settled by the small model, {large_tier} escalated to the large model")
+            
+            if save_to_pool:
+                with st.spinner("💾 Adding resumes to talent pool..."):
+                    talent_pool = TalentPoolAgent(ats_agent)
+                    talent_pool.add_candidates([r['resume_text'] for r in results], [r['filename'] for r in results])
+                st.caption(f"🗂️ Talent pool now holds {talent_pool.pool_size()} candidate(s)")
             
             if mode == "Single Resume":
                 display_single_result(results[0])
+                if extra_analyses:
+                    with st.spinner("🧾 Running additional analyses..."):
+                        analyses = ats_agent.analyze_full(results[0]['resume_text'], job_description, [EXTRA_ANALYSES[label] for label in extra_analyses])
+                    display_full_analysis(analyses)
             else:
-                display_bulk_results(results)
+                display_bulk_results(rerank_results(ats_agent, results, job_description) if rerank else results)
             
         except Exception as e:
             st.error(f"❌ Error: {str(e)}")
 
+def format_token_usage(model, stats):
+    text = f"{model} {stats['prompt_tokens']:,} over {stats['calls']} call(s)"
+    if stats['cached_tokens']:
+        text += f", {stats['cached_tokens']:,} served from the provider prompt cache ({stats['cached_tokens'] / stats['prompt_tokens']:.0%})"
+    return text
+
+def run_talent_pool_search(job_description, top_k, max_concurrency, prescreen, compress, cascade, packed, rerank, retrieval_mode):
+    if not job_description.strip():
+        st.error("❌ Provide a job description")
+        return
+    
+    try:
+        with st.spinner("🔧 Loading talent pool..."):
+            talent_pool = TalentPoolAgent(ATSAgent(use_compressed_resume=compress, cascade=cascade), max_concurrency=max_concurrency, prescreen=prescreen, packed=packed, retrieval_mode=retrieval_mode)
+        
+        if talent_pool.pool_size() == 0:
+            st.warning("🗂️ The talent pool is empty. Screen resumes in Bulk Upload mode with 'Save to talent pool' enabled first.")
+            return
+        
+        results = []
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        status_text.text(f"🔎 Searching {talent_pool.pool_size()} stored candidate(s)...")
+        
+        for data in talent_pool.search_and_screen(job_description, top_k):
+            if data['error']:
+                st.warning(f"⚠️ Could not screen {data['filename']}: {data['error']}")
+            else:
+                results.append(data)
+            status_text.text(f"🔍 Screened {data['filename']} ({len(results)}/{top_k})...")
+            progress_bar.progress(min(1.0, len(results) / top_k))
+        
+        progress_bar.empty()
+        status_text.empty()
+        
+        if not results:
+            st.error("❌ No candidates could be screened")
+            return
+        st.success(f"✅ Screened the top {len(results)} of {talent_pool.pool_size()} stored candidate(s)")
+        display_bulk_results(rerank_results(talent_pool.ats_agent, results, job_description) if rerank else results)
+    
+    except Exception as e:
+        st.error(f"❌ Error: {str(e)}")
+
+def rerank_results(ats_agent, results, job_description):
+    with st.spinner(f"🏆 Reranking the top {min(len(results), Config.RANKING_TOP_K)} candidate(s)..."):
+        ranking_agent = RankingAgent(ats_agent.llm_service)
+        ranked = ranking_agent.rerank(results, job_description)
+    st.caption(f"🏆 LLM reranking used {ranking_agent.calls} call(s)")
+    return ranked
+
+def stream_single_result(ats_agent, resume_file, job_description, prescreen):
+    # Renders the screening field by field while the LLM response streams in
+    name, resume_text, error = next(PDFParser.extract_texts([resume_file]))
+    if error:
+        return {'filename': name, 'resume_text': None, 'result': None, 'error': error}
+    
+    job_requirements = get_jd_registry().get(job_description, requirements=True).requirements if prescreen else None
+    live = st.empty()
+    result = None
+    try:
+        for item in ats_agent.screen_resume_stream(resume_text, job_description, job_requirements):
+            if isinstance(item, ATSScreeningResult):
+                result = item
+            else:
+                with live.container():
+                    render_screening_fields(item)
+    except Exception as e:
+        return {'filename': name, 'resume_text': resume_text, 'result': None, 'error': str(e)}
+    finally:
+        live.empty()
+    return {'filename': name, 'resume_text': resume_text, 'result': result, 'error': None}
+
 def display_single_result(data):
-    result = data['result']
+    render_screening_fields(data['result'].model_dump())
+
+def display_full_analysis(analyses):
     st.markdown("---")
-    st.markdown("## 📊 ATS Screening Result")
+    st.markdown("## 🧾 Additional Analyses")
     
-    # Decision badge
-    if result.final_decision == "SHORTLIST":
-        st.markdown('<div class="shortlist-badge">✅ SHORTLISTED</div>', unsafe_allow_html=True)
-    else:
-        st.markdown('<div class="reject-badge">❌ REJECTED</div>', unsafe_allow_html=True)
+    if 'ats_scan' in analyses:
+        scan = analyses['ats_scan']
+        with st.expander(f"📄 ATS Format Scan: {scan.ats_score:.0f}/100", expanded=True):
+            for issue in scan.ats_issues:
+                st.warning(f"○ {issue}")
+            for suggestion in scan.improvement_suggestions:
+                st.markdown(f"💡 {suggestion}")
     
-    st.info(f"**Recruiter Decision:** {result.decision_reason}")
+    if 'skill_gaps' in analyses:
+        gaps = analyses['skill_gaps']
+        with st.expander("🧩 Skill Gaps", expanded=True):
+            for skill in gaps.must_have_missing_skills:
+                st.error(f"✗ {skill}")
+            for skill in gaps.good_to_have_missing_skills:
+                st.warning(f"○ {skill}")
+            for recommendation in gaps.learning_recommendations:
+                st.markdown(f"📚 {recommendation}")
     
-    # Score cards
-    col1, col2, col3, col4 = st.columns(4)
+    if 'summary' in analyses:
+        summary = analyses['summary']
+        with st.expander(f"👤 Candidate Summary: {summary.candidate_level}", expanded=True):
+            st.markdown(f"**Key Expertise:** {', '.join(summary.key_expertise)}")
+            st.markdown(f"**Most Impressive Project:** {summary.most_impressive_project}")
+            st.info(f"**Recommendation:** {summary.hiring_recommendation}")
     
-    with col1:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h2>🎯</h2>
-            <h1>{result.overall_match_score:.1f}%</h1>
-            <p>Overall Match</p>
-        </div>
-        """, unsafe_allow_html=True)
+    if 'interview_questions' in analyses:
+        questions = analyses['interview_questions']
+        with st.expander("🎤 Interview Questions", expanded=True):
+            for title, items in [("Technical", questions.technical_questions), ("Project", questions.project_questions), ("HR", questions.hr_questions)]:
+                st.markdown(f"**{title}**")
+                for question in items:
+                    st.markdown(f"- {question}")
+
+SCORE_CARDS = [
+    ('overall_match_score', '🎯', 'Overall Match'),
+    ('technical_skill_match', '💻', 'Technical Skills'),
+    ('project_relevance_score', '📁', 'Project Relevance'),
+    ('experience_score', '⏱️', 'Experience')
+]
+
+def render_screening_fields(fields):
+    # Draws whichever fields are present, so a partially streamed result shows what is already known
+    st.markdown("---")
+    st.markdown("## 📊 ATS Screening Result")
     
-    with col2:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h2>💻</h2>
-            <h1>{result.technical_skill_match:.1f}%</h1>
-            <p>Technical Skills</p>
-        </div>
-        """, unsafe_allow_html=True)
+    # Decision badge
+    if 'final_decision' in fields:
+        if str(fields['final_decision']).upper() == "SHORTLIST":
+            st.markdown('<div class="shortlist-badge">✅ SHORTLISTED</div>', unsafe_allow_html=True)
+        else:
+            st.markdown('<div class="reject-badge">❌ REJECTED</div>', unsafe_allow_html=True)
     
-    with col3:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h2>📁</h2>
-            <h1>{result.project_relevance_score:.1f}%</h1>
-            <p>Project Relevance</p>
-        </div>
-        """, unsafe_allow_html=True)
+    if 'decision_reason' in fields:
+        st.info(f"**Recruiter Decision:** {fields['decision_reason']}")
     
-    with col4:
-        st.markdown(f"""
-        <div class="metric-card">
-            <h2>⏱️</h2>
-            <h1>{result.experience_score:.1f}%</h1>
-            <p>Experience</p>
-        </div>
-        """, unsafe_allow_html=True)
+    # Score cards
+    for col, (key, icon, label) in zip(st.columns(4), SCORE_CARDS):
+        if key not in fields:
+            continue
+        with col:
+            st.markdown(f"""
+            <div class="metric-card">
+                <h2>{icon}</h2>
+                <h1>{float(fields[key]):.1f}%</h1>
+                <p>{label}</p>
+            </div>
+            """, unsafe_allow_html=True)
     
     # Skills analysis
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.markdown("### ✅ Matched Skills")
-        for skill in result.matched_skills:
-            st.success(f"✓ {skill}")
+        if 'matched_skills' in fields:
+            st.markdown("### ✅ Matched Skills")
+            for skill in fields['matched_skills']:
+                st.success(f"✓ {skill}")
     
     with col2:
-        st.markdown("### ❌ Missing Critical")
-        for skill in result.missing_critical_skills:
-            st.error(f"✗ {skill}")
+        if 'missing_critical_skills' in fields:
+            st.markdown("### ❌ Missing Critical")
+            for skill in fields['missing_critical_skills']:
+                st.error(f"✗ {skill}")
     
     with col3:
-        st.markdown("### ⚠️ Nice-to-Have Missing")
-        for skill in result.nice_to_have_missing_skills:
-            st.warning(f"○ {skill}")
+        if 'nice_to_have_missing_skills' in fields:
+            st.markdown("### ⚠️ Nice-to-Have Missing")
+            for skill in fields['nice_to_have_missing_skills']:
+                st.warning(f"○ {skill}")
     
     # Strengths & Weaknesses
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown("### 💪 Strengths")
-        for strength in result.strengths:
-            st.markdown(f"✅ {strength}")
+        if 'strengths' in fields:
+            st.markdown("### 💪 Strengths")
+            for strength in fields['strengths']:
+                st.markdown(f"✅ {strength}")
     
     with col2:
-        st.markdown("### 🔍 Weaknesses")
-        for weakness in result.weaknesses:
-            st.markdown(f"⚠️ {weakness}")
+        if 'weaknesses' in fields:
+            st.markdown("### 🔍 Weaknesses")
+            for weakness in fields['weaknesses']:
+                st.markdown(f"⚠️ {weakness}")
+
+def ranked_order(results):
+    # Reranked results arrive in their final order; otherwise rank by score
+    if any('llm_rank' in data for data in results):
+        return results
+    return sorted(results, key=lambda x: x['result'].overall_match_score, reverse=True)
+
+def build_results_table(results):
+    df_data = []
+    reranked = any('llm_rank' in data for data in results)
+    for data in ranked_order(results):
+        r = data['result']
+        df_data.append({
+            'Candidate': data['filename'],
+            'Decision': r.final_decision,
+            'Overall': f"{r.overall_match_score:.1f}%",
+            'Technical': f"{r.technical_skill_match:.1f}%",
+            'Projects': f"{r.project_relevance_score:.1f}%",
+            'Experience': f"{r.experience_score:.1f}%",
+            'Matched Skills': len(r.matched_skills),
+            'Missing Critical': len(r.missing_critical_skills),
+            'Decided By': r.decided_by,
+            **({'LLM Rank': data.get('llm_rank', "")} if reranked else {})
+        })
+    return pd.DataFrame(df_data)
 
 def display_bulk_results(results):
     st.markdown("---")
@@ -248,22 +446,7 @@ def display_bulk_results(results):
         st.metric("📈 Avg Score", f"{avg_score:.1f}%")
     
     # Results table
-    df_data = []
-    for data in results:
-        r = data['result']
-        df_data.append({
-            'Candidate': data['filename'],
-            'Decision': r.final_decision,
-            'Overall': f"{r.overall_match_score:.1f}%",
-            'Technical': f"{r.technical_skill_match:.1f}%",
-            'Projects': f"{r.project_relevance_score:.1f}%",
-            'Experience': f"{r.experience_score:.1f}%",
-            'Matched Skills': len(r.matched_skills),
-            'Missing Critical': len(r.missing_critical_skills)
-        })
-    
-    df = pd.DataFrame(df_data)
-    df = df.sort_values('Overall', ascending=False)
+    df = build_results_table(results)
     
     st.markdown("### 📋 Candidate Rankings")
     st.dataframe(df, use_container_width=True, hide_index=True)
@@ -273,11 +456,13 @@ def display_bulk_results(results):
     
     # Individual details
     st.markdown("### 👥 Detailed Candidate Analysis")
-    for idx, data in enumerate(sorted(results, key=lambda x: x['result'].overall_match_score, reverse=True)):
+    for idx, data in enumerate(ranked_order(results)):
         r = data['result']
         badge = "🟢 SHORTLIST" if r.final_decision == "SHORTLIST" else "🔴 REJECT"
         with st.expander(f"{idx+1}. {data['filename']} - {r.overall_match_score:.1f}% - {badge}"):
             st.info(r.decision_reason)
+            if data.get('rank_reason'):
+                st.caption(f"🏆 Ranking: {data['rank_reason']}")
             col1, col2 = st.columns(2)
             with col1:
                 st.markdown("**Strengths:**")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import List
+from typing import List, Optional
 
 class ResumeData(BaseModel):
     skills: List[str]
@@ -33,6 +33,12 @@ class JobRequirements(BaseModel):
     def validate_strings(cls, v):
         return v.strip() if v and v.strip() else "Not specified"
 
+class ProcessedJobDescription(BaseModel):
+    jd_hash: str
+    cleaned_text: str
+    requirements: Optional[JobRequirements] = None
+    embedding: Optional[List[float]] = None
+
 class ATSScreeningResult(BaseModel):
     overall_match_score: float = Field(ge=0, le=100)
     technical_skill_match: float = Field(ge=0, le=100)
@@ -45,6 +51,7 @@ class ATSScreeningResult(BaseModel):
     weaknesses: List[str]
     final_decision: str
     decision_reason: str
+    decided_by: str = "llm"
     
     @field_validator('final_decision')
     def validate_decision(cls, v):
@@ -0,0 +1,145 @@
+import json
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict
+from app.services.openai_service import OpenAIService
+from app.services.llm_router import create_llm_service
+from app.utils.token_budget import count_tokens
+from app.config import Config
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+def batch_request(custom_id: str, prompt: str, model: str, json_mode: bool = True) -> Dict[str, Any]:
+    # One line of a batch input file, in the OpenAI /v1/chat/completions batch format
+    body = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": Config.MAX_TOKENS,
+        "temperature": Config.TEMPERATURE
+    }
+    if json_mode:
+        body["response_format"] = {"type": "json_object"}
+    return {"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": body}
+
+class OpenAIBatchBackend:
+    # OpenAI Batch API: the input file is uploaded, run within BATCH_COMPLETION_WINDOW at the batch discount,
+    # and its output file downloaded. The pinned openai client has no batches resource yet, so those two
+    # endpoints go through the client's generic get/post.
+    def __init__(self):
+        self.client = OpenAIService().client
+        self.model = Config.OPENAI_MODEL
+    
+    def submit(self, input_path: str) -> str:
+        try:
+            with open(input_path, "rb") as input_file:
+                uploaded = self.client.files.create(file=input_file, purpose="batch")
+            batch = self.client.post(
+                "/batches",
+                cast_to=Dict[str, Any],
+                body={"input_file_id": uploaded.id, "endpoint": "/v1/chat/completions", "completion_window": Config.BATCH_COMPLETION_WINDOW}
+            )
+            return batch["id"]
+        except Exception as e:
+            raise Exception(f"OpenAI batch error: {str(e)}")
+    
+    def status(self, batch_id: str) -> Dict[str, Any]:
+        try:
+            return self.client.get(f"/batches/{batch_id}", cast_to=Dict[str, Any])
+        except Exception as e:
+            raise Exception(f"OpenAI batch error: {str(e)}")
+    
+    def download(self, batch: Dict[str, Any], output_path: str):
+        # Failed requests land in the separate error file; both share the output line format
+        try:
+            with open(output_path, "wb") as output:
+                for file_id in (batch.get("output_file_id"), batch.get("error_file_id")):
+                    if file_id:
+                        output.write(self.client.files.content(file_id).content)
+        except Exception as e:
+            raise Exception(f"OpenAI batch error: {str(e)}")
+
+class LocalBatchBackend:
+    # File-based stand-in for the provider batch API, used in demo mode and tests. A submitted batch is run
+    # through the configured LLM service the first time its status is polled, and its output file uses the
+    # provider's batch output format.
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.llm_service = create_llm_service()
+        self.model = self.llm_service.model
+    
+    def submit(self, input_path: str) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        batch_dir = self.root / batch_id
+        batch_dir.mkdir()
+        shutil.copyfile(input_path, batch_dir / "input.jsonl")
+        self._write_status(batch_dir, {"id": batch_id, "status": "validating"})
+        return batch_id
+    
+    def status(self, batch_id: str) -> Dict[str, Any]:
+        batch_dir = self.root / batch_id
+        if not batch_dir.exists():
+            raise Exception(f"Local batch error: unknown batch {batch_id}")
+        batch = json.loads((batch_dir / "status.json").read_text(encoding="utf-8"))
+        if batch["status"] not in TERMINAL_STATUSES:
+            batch = self._process(batch_dir, batch)
+        return batch
+    
+    def download(self, batch: Dict[str, Any], output_path: str):
+        shutil.copyfile(batch["output_file_id"], output_path)
+    
+    def _process(self, batch_dir: Path, batch: Dict[str, Any]) -> Dict[str, Any]:
+        with open(batch_dir / "input.jsonl", encoding="utf-8") as input_file:
+            requests = [json.loads(line) for line in input_file if line.strip()]
+        with ThreadPoolExecutor(max_workers=Config.MAX_CONCURRENT_SCREENINGS) as executor:
+            lines = list(executor.map(self._execute, requests))
+            
+        output_path = batch_dir / "output.jsonl"
+        with open(output_path, "w", encoding="utf-8") as output:
+            for line in lines:
+                output.write(json.dumps(line) + "\n")
+                
+        failed = sum(1 for line in lines if line["error"])
+        batch = dict(
+            batch,
+            status="completed",
+            output_file_id=str(output_path),
+            request_counts={"total": len(lines), "completed": len(lines) - failed, "failed": failed}
+        )
+        self._write_status(batch_dir, batch)
+        return batch
+    
+    def _execute(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = request["body"]["messages"][-1]["content"]
+        line = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"], "response": None, "error": None}
+        try:
+            content = json.dumps(self.llm_service.chat_completion(prompt))
+        except Exception as e:
+            line["error"] = {"code": "request_failed", "message": str(e)}
+            return line
+            
+        prompt_tokens, completion_tokens = count_tokens(prompt, self.model), count_tokens(content, self.model)
+        line["response"] = {
+            "status_code": 200,
+            "body": {
+                "model": self.model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+            }
+        }
+        return line
+    
+    @staticmethod
+    def _write_status(batch_dir: Path, batch: Dict[str, Any]):
+        (batch_dir / "status.json").write_text(json.dumps(batch), encoding="utf-8")
+
+def create_batch_backend(name: str = None, root: str = None):
+    # Demo mode always uses the local stand-in, which in turn runs on the mock service
+    name = "local" if Config.DEMO_MODE else (name or Config.BATCH_BACKEND)
+    if name == "openai":
+        return OpenAIBatchBackend()
+    if name == "local":
+        return LocalBatchBackend(root or "batch_jobs")
+    raise ValueError(f"Unknown batch backend: {name}")
\ No newline at end of file
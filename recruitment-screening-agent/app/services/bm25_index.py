@@ -0,0 +1,192 @@
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from app.utils.text_cleaner import TextCleaner
+from app.config import Config
+
+# Keeps tech terms such as c++, c#, node.js and ci/cd-style fragments intact
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9+#]+)*")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have in into is it its of on or our that the their this to was
+were will with we you your they he she i me my who what which when where while than then there these those such
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall(TextCleaner.normalize_text(text)) if token not in STOPWORDS]
+
+def encode_varints(values: Iterable[int]) -> bytes:
+    out = bytearray()
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+def decode_varints(data: bytes) -> np.ndarray:
+    # Vectorized LEB128 decode: a byte below 0x80 ends a value, earlier bytes of the value carry 7 bits each
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if raw.size == 0:
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(raw < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    value_index = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = np.arange(raw.size) - starts[value_index]
+    parts = (raw & 0x7F).astype(np.float64) * np.exp2(7 * shifts)
+    return np.bincount(value_index, weights=parts, minlength=len(ends)).astype(np.int64)
+
+class BM25Index:
+    # On-disk inverted index over normalized resume text, keyed by CandidateStore ids. Each term row holds its
+    # postings as varint pairs (doc id gap, term frequency); ids only ever grow, so adds append to the lists.
+    # Document lengths are kept in memory for scoring. The SQLite file is BM25_INDEX_PATH, bm25_index.db in the
+    # working directory unless set.
+    def __init__(self, path: str = None):
+        self.path = path or Config.BM25_INDEX_PATH
+        self.k1 = Config.BM25_K1
+        self.b = Config.BM25_B
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT PRIMARY KEY, df INTEGER NOT NULL, last_id INTEGER NOT NULL, data BLOB NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, length INTEGER NOT NULL)")
+        self._conn.commit()
+        
+        rows = self._conn.execute("SELECT id, length FROM documents").fetchall()
+        self.max_id = max((doc_id for doc_id, _ in rows), default=0)
+        self._lengths = np.zeros(self.max_id + 1, dtype=np.float32)
+        for doc_id, length in rows:
+            self._lengths[doc_id] = length
+        self.doc_count = len(rows)
+        self.total_length = float(sum(length for _, length in rows))
+    
+    @property
+    def avg_length(self) -> float:
+        return self.total_length / self.doc_count if self.doc_count else 0.0
+    
+    def add(self, doc_ids: List[int], texts: List[str]) -> int:
+        # Indexes documents in id order; ids at or below the highest indexed id count as already indexed
+        new_postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        lengths: Dict[int, int] = {}
+        with self._lock:
+            for doc_id, text in sorted(zip(doc_ids, texts)):
+                if doc_id <= self.max_id or doc_id in lengths:
+                    continue
+                counts = Counter(tokenize(text))
+                lengths[doc_id] = sum(counts.values())
+                for term, tf in counts.items():
+                    new_postings[term].append((doc_id, tf))
+            if not lengths:
+                return 0
+                
+            existing = self._fetch(list(new_postings), "term, df, last_id, data")
+            rows = []
+            for term, postings in new_postings.items():
+                df, last_id, data = existing.get(term, (0, 0, b""))
+                pairs = []
+                for doc_id, tf in postings:
+                    pairs += [doc_id - last_id, tf]
+                    last_id = doc_id
+                rows.append((term, df + len(postings), last_id, data + encode_varints(pairs)))
+            self._conn.executemany("INSERT OR REPLACE INTO postings (term, df, last_id, data) VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany("INSERT INTO documents (id, length) VALUES (?, ?)", list(lengths.items()))
+            self._conn.commit()
+            
+            self.max_id = max(lengths)
+            grown = np.zeros(self.max_id + 1, dtype=np.float32)
+            grown[:len(self._lengths)] = self._lengths
+            for doc_id, length in lengths.items():
+                grown[doc_id] = length
+            self._lengths = grown
+            self.doc_count += len(lengths)
+            self.total_length += sum(lengths.values())
+        return len(lengths)
+    
+    def sync(self, store, batch_size: int = 500) -> int:
+        # Indexes stored candidates newer than the index, e.g. a pool built before the index existed
+        added = 0
+        for rows in store.iter_after(self.max_id, batch_size):
+            added += self.add([candidate_id for candidate_id, _ in rows], [text for _, text in rows])
+        return added
+    
+    def _fetch(self, terms: List[str], columns: str) -> Dict[str, tuple]:
+        found = {}
+        for start in range(0, len(terms), 500):
+            chunk = terms[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row in self._conn.execute(f"SELECT {columns} FROM postings WHERE term IN ({placeholders})", chunk):
+                found[row[0]] = row[1:]
+        return found
+    
+    def _weight(self, df: int) -> float:
+        # IDF computed as if an ideal document holding every query term were in the corpus, so the weights stay
+        # positive and defined for an empty corpus or an unseen term
+        return math.log(1 + (self.doc_count - df + 0.5) / (df + 1.5))
+    
+    def _saturate(self, tf: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        avg_length = self.avg_length or max(float(lengths.mean()), 1.0)
+        return tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * lengths / avg_length))
+    
+    def query(self, query_text: str, k: int = None) -> List[Tuple[int, float]]:
+        # Top-k (doc id, score) pairs. Scores are BM25 normalized by the query's upper reference: a document of
+        # average length holding each query term once scores 1.0, and scores are capped there.
+        k = k or Config.TALENT_POOL_TOP_K
+        terms = sorted(set(tokenize(query_text)))
+        with self._lock:
+            if not terms or self.doc_count == 0:
+                return []
+            rows = self._fetch(terms, "term, df, data")
+            lengths = self._lengths
+            
+        ideal = sum(self._weight(rows[term][0] if term in rows else 0) for term in terms)
+        doc_ids, contributions = [], []
+        for df, data in rows.values():
+            pairs = decode_varints(data).reshape(-1, 2)
+            ids = np.cumsum(pairs[:, 0])
+            doc_ids.append(ids)
+            contributions.append(self._weight(df) * self._saturate(pairs[:, 1].astype(np.float32), lengths[ids]))
+        if not doc_ids:
+            return []
+            
+        unique_ids, inverse = np.unique(np.concatenate(doc_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions)) / ideal
+        if k < len(scores):
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(unique_ids[i]), float(min(1.0, scores[i]))) for i in top]
+    
+    def score_texts(self, query_text: str, texts: List[str]) -> List[float]:
+        # The same normalized score for documents that need not be indexed, using the corpus statistics
+        terms = sorted(set(tokenize(query_text)))
+        if not terms:
+            return [0.0] * len(texts)
+        with self._lock:
+            dfs = {term: row[0] for term, row in self._fetch(terms, "term, df").items()}
+        weights = np.array([self._weight(dfs.get(term, 0)) for term in terms])
+        
+        counts = [Counter(tokenize(text)) for text in texts]
+        tf = np.array([[count.get(term, 0) for term in terms] for count in counts], dtype=np.float32).reshape(len(texts), len(terms))
+        lengths = np.array([sum(count.values()) for count in counts], dtype=np.float32)
+        scores = self._saturate(tf, lengths[:, None]) @ weights / weights.sum()
+        return [float(min(1.0, score)) for score in scores]
+    
+    def score_text(self, query_text: str, text: str) -> float:
+        return self.score_texts(query_text, [text])[0]
+
+_shared_index: Optional[BM25Index] = None
+_shared_lock = threading.Lock()
+
+def get_bm25_index() -> BM25Index:
+    global _shared_index
+    with _shared_lock:
+        if _shared_index is None:
+            _shared_index = BM25Index()
+    return _shared_index
\ No newline at end of file
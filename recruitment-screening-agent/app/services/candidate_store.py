@@ -0,0 +1,109 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.config import Config
+
+class CandidateStore:
+    # Candidate metadata for the FAISS index; row ids double as the stable FAISS vector ids. The SQLite file is
+    # CANDIDATE_STORE_PATH, candidates.db in the working directory unless set.
+    def __init__(self, path: str = None):
+        self.path = path or Config.CANDIDATE_STORE_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS candidates ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, text TEXT NOT NULL, "
+            "text_hash TEXT NOT NULL, metadata TEXT, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_text_hash ON candidates(text_hash)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+    
+    def add_many(self, texts: List[str], names: List[str] = None, metadata: List[Dict[str, Any]] = None) -> List[int]:
+        names = names or [None] * len(texts)
+        metadata = metadata or [None] * len(texts)
+        now = time.time()
+        ids = []
+        with self._lock:
+            for text, name, meta in zip(texts, names, metadata):
+                cursor = self._conn.execute(
+                    "INSERT INTO candidates (name, text, text_hash, metadata, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (name, text, hashlib.sha256(text.encode("utf-8")).hexdigest(), json.dumps(meta) if meta else None, now)
+                )
+                ids.append(cursor.lastrowid)
+            self._conn.commit()
+        return ids
+    
+    def get_many(self, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        found = {}
+        if not ids:
+            return found
+            
+        with self._lock:
+            for start in range(0, len(ids), 500):
+                chunk = [int(candidate_id) for candidate_id in ids[start:start + 500]]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT id, name, text, metadata, created_at FROM candidates WHERE id IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                for candidate_id, name, text, meta, created_at in rows:
+                    found[candidate_id] = {
+                        'id': candidate_id,
+                        'name': name,
+                        'text': text,
+                        'metadata': json.loads(meta) if meta else {},
+                        'created_at': created_at
+                    }
+        return found
+    
+    def find_by_text(self, text: str) -> Optional[int]:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            row = self._conn.execute("SELECT id FROM candidates WHERE text_hash = ? LIMIT 1", (text_hash,)).fetchone()
+        return row[0] if row else None
+    
+    def iter_after(self, last_id: int, batch_size: int = 500) -> Iterator[List[Tuple[int, str]]]:
+        # (id, text) pairs newer than last_id, in id order
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, text FROM candidates WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+    
+    def count(self) -> int:
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COUNT(*) FROM candidates").fetchone()
+        return total
+    
+    def max_id(self) -> int:
+        with self._lock:
+            (last_id,) = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM candidates").fetchone()
+        return last_id
+    
+    def get_meta(self, key: str, default: str = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+    
+    def set_meta(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)", (key, value))
+            self._conn.commit()
+
+_shared_store: Optional[CandidateStore] = None
+_shared_lock = threading.Lock()
+
+def get_candidate_store() -> CandidateStore:
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = CandidateStore()
+    return _shared_store
\ No newline at end of file
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+import weakref
+import httpx
+from typing import Any, Callable, Dict
+from app.config import Config
+
+# One pooled API client per provider for the whole process, shared by every agent.
+# Async clients are additionally keyed by event loop because httpx connections
+# cannot be reused across loops.
+_sync_clients: Dict[str, Any] = {}
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=Config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.HTTP_MAX_KEEPALIVE_CONNECTIONS
+    )
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(Config.HTTP_TIMEOUT, connect=10.0)
+
+def pooled_http_client() -> httpx.Client:
+    return httpx.Client(limits=_limits(), timeout=_timeout())
+
+def pooled_async_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(limits=_limits(), timeout=_timeout())
+
+def get_client(provider: str, factory: Callable[[], Any]) -> Any:
+    client = _sync_clients.get(provider)
+    if client is None:
+        with _lock:
+            client = _sync_clients.get(provider)
+            if client is None:
+                client = factory()
+                _sync_clients[provider] = client
+    return client
+
+def get_async_client(provider: str, factory: Callable[[], Any]) -> Any:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        client = clients.get(provider)
+        if client is None:
+            client = factory()
+            clients[provider] = client
+    return client
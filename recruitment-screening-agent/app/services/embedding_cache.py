@@ -0,0 +1,73 @@
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import Dict, List, Optional
+from app.config import Config
+
+class EmbeddingCache:
+    # Persistent vector store keyed by (text hash, embedding model); vectors are kept as float32 blobs.
+    # The SQLite file is EMBEDDING_CACHE_PATH, embedding_cache.db in the working directory unless set.
+    def __init__(self, path: str = None):
+        self.path = path or Config.EMBEDDING_CACHE_PATH
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "text_hash TEXT NOT NULL, model TEXT NOT NULL, dimension INTEGER NOT NULL, "
+            "vector BLOB NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (text_hash, model))"
+        )
+        self._conn.commit()
+    
+    def get_many(self, text_hashes: List[str], model: str) -> Dict[str, np.ndarray]:
+        found = {}
+        if not text_hashes:
+            return found
+            
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(text_hashes), 500):
+                chunk = text_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype=np.float32)
+            self.hits += len(found)
+            self.misses += len(text_hashes) - len(found)
+        return found
+    
+    def set_many(self, vectors: Dict[str, np.ndarray], model: str):
+        now = time.time()
+        rows = []
+        for text_hash, vector in vectors.items():
+            vector = np.ascontiguousarray(vector, dtype=np.float32)
+            rows.append((text_hash, model, vector.shape[0], vector.tobytes(), now))
+            
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (text_hash, model, dimension, vector, created_at) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'size': size}
+
+_shared_cache: Optional[EmbeddingCache] = None
+_shared_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    global _shared_cache
+    if not Config.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = EmbeddingCache()
+    return _shared_cache
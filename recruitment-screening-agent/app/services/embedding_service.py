@@ -1,13 +1,49 @@
 from app.services.openai_service import OpenAIService
+from app.services.mock_openai_service import MockOpenAIService
+from app.services.embedding_cache import get_embedding_cache
+from app.config import Config
+import hashlib
 import numpy as np
-from typing import List
+from typing import Dict, List
 
 class EmbeddingService:
     def __init__(self):
-        self.openai_service = OpenAIService()
+        if Config.DEMO_MODE:
+            self.openai_service = MockOpenAIService()
+            self.model = "demo"
+        else:
+            self.openai_service = OpenAIService()
+            self.model = Config.EMBEDDING_MODEL
+        self.cache = get_embedding_cache()
     
     def get_embedding(self, text: str) -> List[float]:
-        return self.openai_service.generate_embedding(text)
+        return self.get_embeddings([text])[0].tolist()
+    
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        # Returns a float32 matrix with one row per input text, in input order
+        hashes = [self._text_hash(text) for text in texts]
+        unique_texts = dict(zip(hashes, texts))
+        
+        vectors: Dict[str, np.ndarray] = {}
+        if self.cache:
+            vectors.update(self.cache.get_many(list(unique_texts), self.model))
+            
+        missing = [text_hash for text_hash in unique_texts if text_hash not in vectors]
+        for start in range(0, len(missing), Config.EMBEDDING_BATCH_SIZE):
+            batch = missing[start:start + Config.EMBEDDING_BATCH_SIZE]
+            embeddings = self.openai_service.generate_embeddings([unique_texts[text_hash] for text_hash in batch])
+            fetched = {text_hash: np.asarray(embedding, dtype=np.float32) for text_hash, embedding in zip(batch, embeddings)}
+            if self.cache:
+                self.cache.set_many(fetched, self.model)
+            vectors.update(fetched)
+            
+        if not hashes:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.vstack([vectors[text_hash] for text_hash in hashes])
+    
+    @staticmethod
+    def _text_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
     
     def cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         v1 = np.array(vec1)
@@ -2,29 +2,102 @@ import faiss
 import numpy as np
 import pickle
 import os
-from typing import List, Tuple
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from app.config import Config
+from app.services.candidate_store import CandidateStore, get_candidate_store
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+TRAINED_INDEX_TYPES = ("ivf_flat", "ivf_pq")
 
 class FAISSService:
-    def __init__(self, dimension: int = 1536):
+    # Vectors live in an IndexIDMap2 keyed by CandidateStore ids. Every insert is appended to a
+    # fixed-size record log next to the index; the index file itself is only a periodic snapshot,
+    # and on load any log records newer than the snapshot are replayed. Both files sit in the working
+    # directory: FAISS_INDEX_PATH (faiss_index.bin) and the log next to it (faiss_index.bin.vectors).
+    def __init__(self, dimension: int = 1536, index_type: str = None, index_path: str = None, store: CandidateStore = None):
         self.dimension = dimension
-        self.index = faiss.IndexFlatIP(dimension)
-        self.texts = []
-        self.index_path = Config.FAISS_INDEX_PATH
+        self.index_type = (index_type or Config.FAISS_INDEX_TYPE).lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported FAISS index type: {self.index_type}")
+        self.index_path = index_path or Config.FAISS_INDEX_PATH
+        self.log_path = self.index_path + ".vectors"
+        self.store = store or CandidateStore()
+        self.record_dtype = np.dtype([('id', '<i8'), ('vector', '<f4', (dimension,))])
+        self.train_threshold = Config.FAISS_TRAIN_THRESHOLD
+        if self.index_type == "ivf_pq":
+            # PQ codebooks need at least 2^nbits training points
+            self.train_threshold = max(self.train_threshold, 256)
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._unsaved = 0
+        self.index = self._new_index()
         self.load_index()
     
-    def add_vectors(self, vectors: List[List[float]], texts: List[str]):
-        vectors_np = np.array(vectors, dtype=np.float32)
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal
+    
+    @property
+    def is_trained(self) -> bool:
+        # Trainable index types serve from a flat staging index until the threshold is reached
+        return self.index_type not in TRAINED_INDEX_TYPES or self._base_type(self.index) == self.index_type
+    
+    def add_vectors(self, vectors: List[List[float]], texts: List[str], names: List[str] = None, metadata: List[Dict[str, Any]] = None) -> List[int]:
+        with self._lock:
+            ids = self.store.add_many(texts, names, metadata)
+            self._index_vectors(ids, vectors)
+        return ids
+    
+    def sync(self, embed: Callable[[List[str]], List[List[float]]], batch_size: int = 500) -> int:
+        # Embeds stored candidates that have no vector yet, e.g. ones added while retrieval ran on BM25 alone.
+        # Rows stored after the snapshot below come from add_vectors with their vectors and are left alone.
+        with self._sync_lock:
+            with self._lock:
+                log = self._read_log()
+                if len(log) >= self.store.count():
+                    return 0
+                indexed = set(log['id'].tolist())
+                last_id = self.store.max_id()
+            added = 0
+            for rows in self.store.iter_after(0, batch_size):
+                missing = [(candidate_id, text) for candidate_id, text in rows if candidate_id <= last_id and candidate_id not in indexed]
+                if missing:
+                    self._index_vectors([candidate_id for candidate_id, _ in missing], embed([text for _, text in missing]))
+                    added += len(missing)
+                if rows[-1][0] >= last_id:
+                    break
+            return added
+    
+    def _index_vectors(self, ids: List[int], vectors: List[List[float]]):
+        vectors_np = np.array(vectors, dtype=np.float32).reshape(-1, self.dimension)
         faiss.normalize_L2(vectors_np)
-        self.index.add(vectors_np)
-        self.texts.extend(texts)
-        self.save_index()
+        ids_np = np.array(ids, dtype=np.int64)
+        with self._lock:
+            self._append_log(ids_np, vectors_np)
+            
+            if not self.is_trained and self.index.ntotal + len(ids) >= self.train_threshold:
+                self._train_from_log()
+                return
+                
+            self.index.add_with_ids(vectors_np, ids_np)
+            self._unsaved += len(ids)
+            if self._unsaved >= Config.FAISS_SNAPSHOT_INTERVAL:
+                self.save_index()
     
-    def search(self, query_vector: List[float], k: int = 5) -> List[Tuple[str, float]]:
+    def search_ids(self, query_vector: List[float], k: int = 5) -> List[Tuple[int, float]]:
         query_np = np.array([query_vector], dtype=np.float32)
         faiss.normalize_L2(query_np)
-        scores, indices = self.index.search(query_np, min(k, self.index.ntotal))
-        return [(self.texts[idx], float(score)) for score, idx in zip(scores[0], indices[0]) if idx < len(self.texts)]
+        with self._lock:
+            if self.index.ntotal == 0:
+                return []
+            scores, ids = self.index.search(query_np, min(k, self.index.ntotal))
+        return [(int(candidate_id), float(score)) for score, candidate_id in zip(scores[0], ids[0]) if candidate_id != -1]
+    
+    def search(self, query_vector: List[float], k: int = 5) -> List[Tuple[str, float]]:
+        hits = self.search_ids(query_vector, k)
+        candidates = self.store.get_many([candidate_id for candidate_id, _ in hits])
+        return [(candidates[candidate_id]['text'], score) for candidate_id, score in hits if candidate_id in candidates]
     
     def similarity_score(self, vec1: List[float], vec2: List[float]) -> float:
         v1 = np.array(vec1, dtype=np.float32)
@@ -33,13 +106,155 @@ class FAISSService:
         v2 = v2 / np.linalg.norm(v2)
         return max(0.0, min(1.0, float(np.dot(v1, v2))))
     
+    def score_many(self, query_vector: List[float], matrix: np.ndarray, top_k: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        # Cosine similarity of one query against every row of a float32 matrix in a single BLAS call.
+        # Rows of a float32, C-contiguous matrix are normalized in place.
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+            
+        query_np = np.array([query_vector], dtype=np.float32)
+        faiss.normalize_L2(query_np)
+        faiss.normalize_L2(matrix)
+        
+        scores = matrix @ query_np[0]
+        np.clip(scores, 0.0, 1.0, out=scores)
+        
+        if top_k is None or top_k >= len(scores):
+            indices = np.argsort(-scores, kind="stable")
+        else:
+            indices = np.argpartition(-scores, top_k)[:top_k]
+            indices = indices[np.argsort(-scores[indices], kind="stable")]
+        return scores, indices
+    
     def save_index(self):
-        faiss.write_index(self.index, self.index_path)
-        with open(self.index_path + ".texts", "wb") as f:
-            pickle.dump(self.texts, f)
+        with self._lock:
+            tmp_path = self.index_path + ".tmp"
+            faiss.write_index(self.index, tmp_path)
+            os.replace(tmp_path, self.index_path)
+            self._unsaved = 0
     
     def load_index(self):
-        if os.path.exists(self.index_path) and os.path.exists(self.index_path + ".texts"):
-            self.index = faiss.read_index(self.index_path)
-            with open(self.index_path + ".texts", "rb") as f:
-                self.texts = pickle.load(f)
\ No newline at end of file
+        with self._lock:
+            index = faiss.read_index(self.index_path) if os.path.exists(self.index_path) else None
+            
+            if index is not None and not isinstance(index, faiss.IndexIDMap2):
+                self._migrate_legacy_index(index)
+                return
+                
+            log = self._read_log()
+            # A snapshot built for a different index type is discarded and rebuilt from the log
+            if index is not None and self._snapshot_usable(index) and index.ntotal <= len(log):
+                self.index = index
+                self._configure_search(self.index)
+            else:
+                self.index = self._new_index()
+                
+            if not self.is_trained and len(log) >= self.train_threshold:
+                self._train_from_log()
+                return
+                
+            # The snapshot holds the first ntotal log records; replay whatever came after it
+            replayed = self._add_from_log(log, start=self.index.ntotal)
+            if replayed:
+                self.save_index()
+    
+    def _new_index(self, train_vectors: np.ndarray = None):
+        if self.index_type == "hnsw":
+            base = faiss.IndexHNSWFlat(self.dimension, Config.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        elif self.index_type in TRAINED_INDEX_TYPES and train_vectors is not None:
+            nlist = max(1, min(Config.FAISS_NLIST, len(train_vectors) // 39))
+            quantizer = faiss.IndexFlatIP(self.dimension)
+            if self.index_type == "ivf_flat":
+                base = faiss.IndexIVFFlat(quantizer, self.dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+            else:
+                base = faiss.IndexIVFPQ(quantizer, self.dimension, nlist, Config.FAISS_PQ_M, 8, faiss.METRIC_INNER_PRODUCT)
+            base.train(train_vectors)
+        else:
+            base = faiss.IndexFlatIP(self.dimension)
+        index = faiss.IndexIDMap2(base)
+        self._configure_search(index)
+        return index
+    
+    @staticmethod
+    def _configure_search(index):
+        base = faiss.downcast_index(index.index)
+        if isinstance(base, faiss.IndexIVF):
+            base.nprobe = Config.FAISS_NPROBE
+        elif isinstance(base, faiss.IndexHNSW):
+            base.hnsw.efSearch = Config.FAISS_HNSW_EF_SEARCH
+    
+    @staticmethod
+    def _base_type(index) -> str:
+        base = faiss.downcast_index(index.index)
+        if isinstance(base, faiss.IndexIVFPQ):
+            return "ivf_pq"
+        if isinstance(base, faiss.IndexIVFFlat):
+            return "ivf_flat"
+        if isinstance(base, faiss.IndexHNSW):
+            return "hnsw"
+        return "flat"
+    
+    def _snapshot_usable(self, index) -> bool:
+        snapshot_type = self._base_type(index)
+        return snapshot_type == self.index_type or (snapshot_type == "flat" and self.index_type in TRAINED_INDEX_TYPES)
+    
+    def _train_from_log(self):
+        log = self._read_log()
+        sample_size = min(len(log), Config.FAISS_MAX_TRAIN_SAMPLE)
+        sample_rows = np.sort(np.random.default_rng(0).choice(len(log), size=sample_size, replace=False))
+        train_vectors = np.ascontiguousarray(log['vector'][sample_rows])
+        
+        self.index = self._new_index(train_vectors)
+        self._add_from_log(log, start=0)
+        self.save_index()
+    
+    def _add_from_log(self, log: np.ndarray, start: int, chunk_size: int = 10000) -> int:
+        for offset in range(start, len(log), chunk_size):
+            chunk = log[offset:offset + chunk_size]
+            self.index.add_with_ids(np.ascontiguousarray(chunk['vector']), np.ascontiguousarray(chunk['id']))
+        return max(0, len(log) - start)
+    
+    def _append_log(self, ids: np.ndarray, vectors: np.ndarray):
+        records = np.empty(len(ids), dtype=self.record_dtype)
+        records['id'] = ids
+        records['vector'] = vectors
+        with open(self.log_path, "ab") as f:
+            f.write(records.tobytes())
+    
+    def _read_log(self) -> np.ndarray:
+        if not os.path.exists(self.log_path):
+            return np.empty(0, dtype=self.record_dtype)
+        # Ignore a trailing partial record left by an interrupted write
+        count = os.path.getsize(self.log_path) // self.record_dtype.itemsize
+        if count == 0:
+            return np.empty(0, dtype=self.record_dtype)
+        return np.memmap(self.log_path, dtype=self.record_dtype, mode="r", shape=(count,))
+    
+    def _migrate_legacy_index(self, legacy_index):
+        # Older versions saved a bare IndexFlatIP plus a pickled list of texts
+        texts_path = self.index_path + ".texts"
+        texts = []
+        if os.path.exists(texts_path):
+            with open(texts_path, "rb") as f:
+                texts = pickle.load(f)
+                
+        self.index = self._new_index()
+        count = min(legacy_index.ntotal, len(texts))
+        if count:
+            self.add_vectors(legacy_index.reconstruct_n(0, count), texts[:count])
+        self.save_index()
+        if os.path.exists(texts_path):
+            os.replace(texts_path, texts_path + ".migrated")
+
+_shared_service: Optional[FAISSService] = None
+_shared_lock = threading.Lock()
+
+def get_faiss_service() -> FAISSService:
+    # One index per process: every instance loads the full snapshot, and several instances appending to the
+    # same vector log would each snapshot only their own inserts, breaking the replay in load_index
+    global _shared_service
+    with _shared_lock:
+        if _shared_service is None:
+            _shared_service = FAISSService(store=get_candidate_store())
+    return _shared_service
\ No newline at end of file
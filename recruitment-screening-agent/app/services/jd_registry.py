@@ -0,0 +1,68 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from app.agents.jd_agent import JDAgent
+from app.services.embedding_service import EmbeddingService
+from app.models.schemas import ProcessedJobDescription
+from app.utils.text_cleaner import TextCleaner
+from app.config import Config
+
+class JDRegistry:
+    # Process-wide handles for job descriptions keyed by content hash. Cleaning happens once per JD;
+    # requirement extraction and the embedding are filled in the first time a caller asks for them.
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or Config.JD_REGISTRY_SIZE
+        self._handles: "OrderedDict[str, ProcessedJobDescription]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fill_lock = threading.Lock()
+        self._jd_agent = None
+        self._embedding_service = None
+    
+    @staticmethod
+    def jd_hash(job_description: str) -> str:
+        return hashlib.sha256(job_description.encode("utf-8")).hexdigest()
+    
+    def get(self, job_description: str, requirements: bool = False, embedding: bool = False) -> ProcessedJobDescription:
+        jd_hash = self.jd_hash(job_description)
+        with self._lock:
+            handle = self._handles.get(jd_hash)
+            if handle is None:
+                handle = ProcessedJobDescription(jd_hash=jd_hash, cleaned_text=TextCleaner.clean_text(job_description))
+                self._handles[jd_hash] = handle
+                while len(self._handles) > self.max_entries:
+                    self._handles.popitem(last=False)
+            self._handles.move_to_end(jd_hash)
+            
+        if requirements and handle.requirements is None:
+            with self._fill_lock:
+                if handle.requirements is None:
+                    handle.requirements = self._extract_requirements(job_description)
+                    
+        if embedding and handle.embedding is None:
+            with self._fill_lock:
+                if handle.embedding is None:
+                    handle.embedding = self._get_embedding_service().get_embedding(handle.cleaned_text)
+        return handle
+    
+    def _extract_requirements(self, job_description: str):
+        # A failed extraction leaves requirements unset, so the next request tries again
+        try:
+            self._jd_agent = self._jd_agent or JDAgent()
+            return self._jd_agent.process_job_description(job_description)
+        except Exception:
+            return None
+    
+    def _get_embedding_service(self):
+        self._embedding_service = self._embedding_service or EmbeddingService()
+        return self._embedding_service
+
+_shared_registry: Optional[JDRegistry] = None
+_shared_lock = threading.Lock()
+
+def get_jd_registry() -> JDRegistry:
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = JDRegistry()
+    return _shared_registry
\ No newline at end of file
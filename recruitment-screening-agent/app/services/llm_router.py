@@ -0,0 +1,301 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+import groq
+import openai
+from pydantic import BaseModel
+from app.services.openai_service import OpenAIService
+from app.services.groq_service import GroqService
+from app.services.mock_openai_service import MockOpenAIService
+from app.services.prompt_registry import get_prompt_registry
+from app.config import Config
+
+# Faults that say nothing about the answer itself: the provider was unreachable, slow, throttled or broken
+AVAILABILITY_ERRORS = (
+    openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError,
+    groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError,
+    ConnectionError, TimeoutError
+)
+
+class ProvidersUnavailable(Exception):
+    pass
+
+def is_availability_error(error: BaseException) -> bool:
+    # The services wrap API errors in a plain Exception, so the original is looked up on the context chain.
+    # Invalid JSON and other content errors are not availability faults and never trigger a failover.
+    while error is not None:
+        if isinstance(error, AVAILABILITY_ERRORS + (ProvidersUnavailable,)):
+            return True
+        if isinstance(error, (openai.APIStatusError, groq.APIStatusError)) and error.status_code >= 500:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+# The model behind the last routed answer in this thread or task
+_answered_model: ContextVar[Optional[str]] = ContextVar("answered_model", default=None)
+
+def cacheable(llm_service) -> bool:
+    # Result cache keys carry the service's model; a router answer from a failover or hedge came from a
+    # different model and must not be stored under the preferred model's key
+    if not isinstance(llm_service, LLMRouter):
+        return True
+    return _answered_model.get() == llm_service.model
+
+class ProviderHealth:
+    # Rolling latency and outcome window for one provider. Too many recent failures open the
+    # circuit for ROUTER_COOLDOWN_SECONDS; after that the provider gets traffic again.
+    def __init__(self):
+        self.latencies = deque(maxlen=Config.ROUTER_WINDOW)
+        self.outcomes = deque(maxlen=Config.ROUTER_WINDOW)
+        self.open_until = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.outcomes.append(ok)
+            if ok:
+                self.latencies.append(latency)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= Config.ROUTER_MIN_SAMPLES and failures / len(self.outcomes) >= Config.ROUTER_ERROR_RATE_THRESHOLD:
+                self.open_until = time.monotonic() + Config.ROUTER_COOLDOWN_SECONDS
+                self.outcomes.clear()
+    
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.open_until
+    
+    def p95(self) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < Config.ROUTER_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            failures = self.outcomes.count(False)
+            calls = len(self.outcomes)
+        p95 = self.p95()
+        return {'healthy': self.healthy, 'p95_seconds': round(p95, 2) if p95 is not None else None, 'recent_failures': failures, 'recent_calls': calls}
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=Config.ROUTER_HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+        return _hedge_pool
+
+_health: Dict[Tuple[str, str], ProviderHealth] = {}
+_health_lock = threading.Lock()
+
+def get_provider_health(provider: str, model: str) -> ProviderHealth:
+    # Tracked per model, like the rate limiters: one model of a provider can be throttled while another is fine
+    key = (provider, model)
+    with _health_lock:
+        if key not in _health:
+            _health[key] = ProviderHealth()
+        return _health[key]
+
+class LLMRouter:
+    # Drop-in replacement for a single LLM service that spreads calls over OpenAI and Groq.
+    # Healthy providers are tried fastest-p95 first, a failed call fails over to the next one,
+    # and with hedging a slow call gets a duplicate on the runner-up provider.
+    def __init__(self, providers: List[Tuple[str, Any]], hedge: bool = None):
+        self.providers = providers
+        self.hedge = Config.ROUTER_HEDGE_ENABLED if hedge is None else hedge
+        # Cache keys follow the preferred provider's model; answers from the others are not cached (see cacheable)
+        self.model = providers[0][1].model
+        self.last_prompt_tokens = 0
+        self.last_provider = None
+    
+    def _ordered(self) -> List[Tuple[str, Any]]:
+        # Healthy before unhealthy; within each group measured providers go by p95 and unmeasured ones follow in
+        # preference order, so a fallback without samples never jumps ahead of a measured preferred provider
+        def rank(item):
+            index, (name, service) = item
+            health = get_provider_health(name, service.model)
+            p95 = health.p95()
+            return (not health.healthy, p95 is None, p95 or 0.0, index)
+        return [provider for _, provider in sorted(enumerate(self.providers), key=rank)]
+    
+    def _call(self, name: str, service, prompt: str, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+        start = time.monotonic()
+        try:
+            result = service.chat_completion(prompt, max_retries=Config.ROUTER_PROVIDER_RETRIES, response_model=response_model)
+        except Exception as e:
+            if is_availability_error(e):
+                get_provider_health(name, service.model).record(time.monotonic() - start, False)
+            raise
+        get_provider_health(name, service.model).record(time.monotonic() - start, True)
+        self.last_prompt_tokens = service.last_prompt_tokens
+        self.last_provider = name
+        return result
+    
+    async def _acall(self, name: str, service, prompt: str, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+        start = time.monotonic()
+        try:
+            result = await service.achat_completion(prompt, max_retries=Config.ROUTER_PROVIDER_RETRIES, response_model=response_model)
+        except Exception as e:
+            if is_availability_error(e):
+                get_provider_health(name, service.model).record(time.monotonic() - start, False)
+            raise
+        get_provider_health(name, service.model).record(time.monotonic() - start, True)
+        self.last_prompt_tokens = service.last_prompt_tokens
+        self.last_provider = name
+        return result
+    
+    def _hedge_delay(self, name: str, service) -> float:
+        return Config.ROUTER_HEDGE_AFTER_SECONDS or get_provider_health(name, service.model).p95() or Config.ROUTER_HEDGE_DEFAULT_SECONDS
+    
+    def chat_completion(self, prompt: str, max_retries: int = 3, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+        # Only availability faults fail over; a content error from a provider that did answer is raised as is
+        ordered = self._ordered()
+        errors = []
+        if self.hedge and len(ordered) > 1:
+            try:
+                service, result = self._hedged(ordered[0], ordered[1], prompt, response_model)
+                _answered_model.set(service.model)
+                return result
+            except ProvidersUnavailable as e:
+                errors.append(str(e))
+                ordered = ordered[2:]
+                
+        for name, service in ordered:
+            try:
+                result = self._call(name, service, prompt, response_model)
+            except Exception as e:
+                self._failed_over(name, e, errors)
+                continue
+            _answered_model.set(service.model)
+            return result
+        raise ProvidersUnavailable(f"All LLM providers failed: {'; '.join(errors)}")
+    
+    @staticmethod
+    def _failed_over(name: str, error: Exception, errors: List[str]):
+        if not is_availability_error(error):
+            raise error
+        errors.append(f"{name}: {str(error)}")
+    
+    def _hedged(self, primary, secondary, prompt: str, response_model: Type[BaseModel] = None) -> Tuple[Any, Dict[str, Any]]:
+        # The duplicate goes out when the primary is slower than its usual p95 or is unavailable;
+        # the first successful answer wins and the other call is left to finish in the background
+        futures = {_get_hedge_pool().submit(self._call, primary[0], primary[1], prompt, response_model): primary}
+        errors = []
+        done, _ = wait(futures, timeout=self._hedge_delay(*primary))
+        for future in done:
+            if future.exception() is None:
+                return primary[1], future.result()
+            self._failed_over(primary[0], future.exception(), errors)
+        futures[_get_hedge_pool().submit(self._call, secondary[0], secondary[1], prompt, response_model)] = secondary
+        
+        pending = set(futures) - done
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, service = futures[future]
+                if future.exception() is None:
+                    return service, future.result()
+                self._failed_over(name, future.exception(), errors)
+        raise ProvidersUnavailable("; ".join(errors))
+    
+    async def achat_completion(self, prompt: str, max_retries: int = 3, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+        ordered = self._ordered()
+        errors = []
+        if self.hedge and len(ordered) > 1:
+            try:
+                service, result = await self._ahedged(ordered[0], ordered[1], prompt, response_model)
+                _answered_model.set(service.model)
+                return result
+            except ProvidersUnavailable as e:
+                errors.append(str(e))
+                ordered = ordered[2:]
+                
+        for name, service in ordered:
+            try:
+                result = await self._acall(name, service, prompt, response_model)
+            except Exception as e:
+                self._failed_over(name, e, errors)
+                continue
+            _answered_model.set(service.model)
+            return result
+        raise ProvidersUnavailable(f"All LLM providers failed: {'; '.join(errors)}")
+    
+    async def _ahedged(self, primary, secondary, prompt: str, response_model: Type[BaseModel] = None) -> Tuple[Any, Dict[str, Any]]:
+        tasks = {asyncio.ensure_future(self._acall(primary[0], primary[1], prompt, response_model)): primary}
+        errors = []
+        done, _ = await asyncio.wait(tasks, timeout=self._hedge_delay(*primary))
+        for task in done:
+            if task.exception() is None:
+                return primary[1], task.result()
+            self._failed_over(primary[0], task.exception(), errors)
+        tasks[asyncio.ensure_future(self._acall(secondary[0], secondary[1], prompt, response_model))] = secondary
+        
+        pending = set(tasks) - done
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name, service = tasks[task]
+                    if task.exception() is None:
+                        return service, task.result()
+                    self._failed_over(name, task.exception(), errors)
+        finally:
+            for other in pending:
+                other.cancel()
+        raise ProvidersUnavailable("; ".join(errors))
+    
+    def chat_completion_stream(self, prompt: str, response_model: Type[BaseModel] = None) -> Iterator[Dict[str, Any]]:
+        # Streams from the best provider; failover is only possible for an availability fault before the first
+        # field has been shown
+        errors = []
+        for name, service in self._ordered():
+            start = time.monotonic()
+            streamed = False
+            try:
+                for fields in service.chat_completion_stream(prompt, response_model=response_model):
+                    streamed = True
+                    yield fields
+            except Exception as e:
+                if not is_availability_error(e):
+                    raise
+                get_provider_health(name, service.model).record(time.monotonic() - start, False)
+                if streamed:
+                    raise
+                errors.append(f"{name}: {str(e)}")
+                continue
+            get_provider_health(name, service.model).record(time.monotonic() - start, True)
+            self.last_prompt_tokens = service.last_prompt_tokens
+            self.last_provider = name
+            _answered_model.set(service.model)
+            return
+        raise ProvidersUnavailable(f"All LLM providers failed: {'; '.join(errors)}")
+    
+    def load_prompt(self, prompt_file: str, **kwargs) -> str:
+        return get_prompt_registry().render(prompt_file, **kwargs)
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: get_provider_health(name, service.model).stats() for name, service in self.providers}
+
+def create_llm_service(tier: str = "large"):
+    # Demo mode uses the mock. With both API keys set and routing on, calls go through the router,
+    # preferring the provider USE_GROQ selects; otherwise the configured provider is used directly.
+    # The "small" tier is the cheaper model of each provider, used first by the screening cascade.
+    small = tier == "small"
+    if Config.DEMO_MODE:
+        return MockOpenAIService("demo-small" if small else None)
+    openai_model = Config.OPENAI_SMALL_MODEL if small else Config.OPENAI_MODEL
+    groq_model = Config.GROQ_SMALL_MODEL if small else Config.GROQ_MODEL
+    preferred = "groq" if Config.USE_GROQ else "openai"
+    if not (Config.LLM_ROUTING_ENABLED and Config.OPENAI_API_KEY and Config.GROQ_API_KEY):
+        return GroqService(groq_model) if preferred == "groq" else OpenAIService(openai_model)
+        
+    providers = [("openai", OpenAIService(openai_model)), ("groq", GroqService(groq_model))]
+    providers.sort(key=lambda provider: provider[0] != preferred)
+    return LLMRouter(providers)
\ No newline at end of file
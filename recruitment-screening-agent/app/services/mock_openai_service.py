@@ -1,9 +1,18 @@
+import asyncio
 import json
+import re
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Type
+from pydantic import BaseModel
+from app.services.prompt_registry import get_prompt_registry
+from app.utils.partial_json import PartialJSONParser
+from app.utils.token_budget import record_usage
 
 class MockOpenAIService:
-    def __init__(self):
+    def __init__(self, model: str = None):
+        self.last_prompt_tokens = 0
+        get_prompt_registry()
+        self.model = model or "demo"
         self.responses = {
             "resume_compression.prompt": {
                 "skills": ["Python", "JavaScript", "React", "SQL", "AWS"],
@@ -36,13 +45,13 @@ class MockOpenAIService:
                 "technical_skill_match": 82.0,
                 "project_relevance_score": 75.0,
                 "experience_score": 80.0,
+                "final_decision": "SHORTLIST",
+                "decision_reason": "Candidate demonstrates strong technical foundation with 5 years of relevant experience. Core skills align well with job requirements. While missing some DevOps tools, the candidate's solid programming background and cloud experience make them a viable fit for the role.",
                 "matched_skills": ["Python", "JavaScript", "React", "SQL"],
                 "missing_critical_skills": ["Docker"],
                 "nice_to_have_missing_skills": ["Kubernetes", "CI/CD"],
                 "strengths": ["Strong full-stack development experience", "Proven track record with modern frameworks", "Cloud platform expertise"],
-                "weaknesses": ["Limited containerization experience", "No DevOps background mentioned"],
-                "final_decision": "SHORTLIST",
-                "decision_reason": "Candidate demonstrates strong technical foundation with 5 years of relevant experience. Core skills align well with job requirements. While missing some DevOps tools, the candidate's solid programming background and cloud experience make them a viable fit for the role."
+                "weaknesses": ["Limited containerization experience", "No DevOps background mentioned"]
             },
             "ats_scanner.prompt": {
                 "ats_score": 85.0,
@@ -80,8 +89,27 @@ class MockOpenAIService:
             }
         }
     
-    def chat_completion(self, prompt: str, max_retries: int = 3) -> Dict[str, Any]:
+        self.responses["full_analysis.prompt"] = {
+            "screening": self.responses["ats_screening.prompt"],
+            "ats_scan": self.responses["ats_scanner.prompt"],
+            "skill_gaps": self.responses["skill_gap.prompt"],
+            "summary": self.responses["candidate_summary.prompt"],
+            "interview_questions": self.responses["interview_questions.prompt"]
+        }
+    
+    def chat_completion(self, prompt: str, max_retries: int = 3, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
         time.sleep(1)
+        self.last_prompt_tokens = record_usage(self.model, prompt)
+        return self._response(prompt)
+    
+    def _response(self, prompt: str) -> Any:
+        # A packed screening gets the canned screening once per candidate ID in the prompt
+        if prompt.startswith("ats_screening_packed.prompt"):
+            return {candidate_id: self.responses["ats_screening.prompt"] for candidate_id in re.findall(r"^### Candidate (C\d+)$", prompt, re.M)}
+        # A ranking keeps the candidates in the order they were listed
+        if prompt.startswith("candidate_ranking.prompt"):
+            candidate_ids = re.findall(r"^### Candidate (C\d+)$", prompt, re.M)
+            return [{"name": candidate_id, "score": 80 - rank, "rank": rank, "reason": "Ranked by screening scores"} for rank, candidate_id in enumerate(candidate_ids, start=1)]
         
         # Extract prompt filename from the prompt
         for prompt_file, response in self.responses.items():
@@ -91,10 +119,36 @@ class MockOpenAIService:
         # Default fallback
         return self.responses["ats_screening.prompt"]
     
+    def chat_completion_stream(self, prompt: str, response_model: Type[BaseModel] = None) -> Iterator[Dict[str, Any]]:
+        # Replays the canned response in small chunks over about a second, like a streamed completion
+        self.last_prompt_tokens = record_usage(self.model, prompt)
+        response = self._response(prompt)
+        
+        content = json.dumps(response)
+        parser = PartialJSONParser()
+        completed = 0
+        chunk_size = max(1, len(content) // 50)
+        for start in range(0, len(content), chunk_size):
+            time.sleep(0.02)
+            fields = parser.feed(content[start:start + chunk_size])
+            if len(fields) > completed:
+                completed = len(fields)
+                yield dict(fields)
+        yield response
+    
+    async def achat_completion(self, prompt: str, max_retries: int = 3, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+        await asyncio.sleep(1)
+        self.last_prompt_tokens = record_usage(self.model, prompt)
+        return self._response(prompt)
+    
     def generate_embedding(self, text: str, max_retries: int = 3) -> List[float]:
         return [0.1] * 1536
     
+    def generate_embeddings(self, texts: List[str], max_retries: int = 3) -> List[List[float]]:
+        return [[0.1] * 1536 for _ in texts]
+    
+    async def agenerate_embedding(self, text: str, max_retries: int = 3) -> List[float]:
+        return [0.1] * 1536
+    
     def load_prompt(self, prompt_file: str, **kwargs) -> str:
-        with open(f"app/prompts/{prompt_file}", 'r') as f:
-            content = f.read().format(**kwargs)
-        return f"{prompt_file}\n{content}"
\ No newline at end of file
+        return f"{prompt_file}\n{get_prompt_registry().render(prompt_file, **kwargs)}"
\ No newline at end of file
@@ -1,48 +1,170 @@
 import openai
+import asyncio
 import json
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Type
+from pydantic import BaseModel
 from app.config import Config
+from app.services import connection_pool
+from app.services.prompt_registry import get_prompt_registry
+from app.services.rate_limiter import get_rate_limiter
+from app.services.structured_output import astructured_completion, repaired_response, structured_completion
+from app.utils.partial_json import PartialJSONParser
+from app.utils.token_budget import count_tokens, record_usage
 
 class OpenAIService:
-    def __init__(self):
-        self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+    def __init__(self, model: str = None):
+        self.last_prompt_tokens = 0
+        get_prompt_registry()
+        self.client = connection_pool.get_client("openai", self._create_client)
+        self.model = model or Config.OPENAI_MODEL
+        self.rate_limiter = get_rate_limiter("openai", self.model)
+        self.embedding_rate_limiter = get_rate_limiter("openai-embeddings", Config.EMBEDDING_MODEL)
     
-    def chat_completion(self, prompt: str, max_retries: int = 3) -> Dict[str, Any]:
+    @staticmethod
+    def _create_client() -> openai.OpenAI:
+        return openai.OpenAI(api_key=Config.OPENAI_API_KEY, http_client=connection_pool.pooled_http_client())
+    
+    @staticmethod
+    def _create_async_client() -> openai.AsyncOpenAI:
+        return openai.AsyncOpenAI(api_key=Config.OPENAI_API_KEY, http_client=connection_pool.pooled_async_http_client())
+    
+    @property
+    def async_client(self) -> openai.AsyncOpenAI:
+        return connection_pool.get_async_client("openai", self._create_async_client)
+    
+    def chat_completion(self, prompt: str, max_retries: int = 3, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+        # With a response_model the call runs in JSON mode and its output is validated against the model;
+        # invalid output gets a short repair call instead of a full re-run
+        json_mode = Config.STRUCTURED_OUTPUT and response_model is not None
+        return structured_completion(lambda text: self._complete(text, max_retries, json_mode), json.loads, prompt, response_model)
+    
+    async def achat_completion(self, prompt: str, max_retries: int = 3, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+        json_mode = Config.STRUCTURED_OUTPUT and response_model is not None
+        return await astructured_completion(lambda text: self._acomplete(text, max_retries, json_mode), json.loads, prompt, response_model)
+    
+    def _complete(self, prompt: str, max_retries: int, json_mode: bool = False) -> str:
+        # The estimate reserves the completion budget too; the unused part is returned after the call
+        estimate = count_tokens(prompt, self.model) + Config.MAX_TOKENS
         for attempt in range(max_retries):
             try:
-                response = self.client.chat.completions.create(
-                    model=Config.OPENAI_MODEL,
-                    messages=[{"role": "user", "content": prompt}],
-                    max_tokens=Config.MAX_TOKENS,
-                    temperature=Config.TEMPERATURE,
-                    timeout=30
-                )
+                with self.rate_limiter.slot(estimate) as slot:
+                    raw = self.client.chat.completions.with_raw_response.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=Config.MAX_TOKENS,
+                        temperature=Config.TEMPERATURE,
+                        timeout=30,
+                        **({"response_format": {"type": "json_object"}} if json_mode else {})
+                    )
+                    response = raw.parse()
+                    slot.record(raw.headers, response.usage.total_tokens if response.usage else None)
+                self.last_prompt_tokens = record_usage(self.model, prompt, response.usage)
                 
-                content = response.choices[0].message.content.strip()
-                return json.loads(content)
+                return response.choices[0].message.content.strip()
                 
-            except (openai.RateLimitError, openai.APITimeoutError) as e:
+            except openai.RateLimitError as e:
+                # The shared limiter has already backed off and holds callers until the quota resets
+                if attempt < max_retries - 1:
+                    continue
+                raise Exception(f"OpenAI API error: {str(e)}")
+            except openai.APITimeoutError as e:
                 if attempt < max_retries - 1:
                     time.sleep(2 ** attempt)
                     continue
                 raise Exception(f"OpenAI API error: {str(e)}")
-            except json.JSONDecodeError:
-                raise ValueError("Invalid JSON response from OpenAI")
             except Exception as e:
                 raise Exception(f"OpenAI API error: {str(e)}")
     
-    def generate_embedding(self, text: str, max_retries: int = 3) -> List[float]:
+    async def _acomplete(self, prompt: str, max_retries: int, json_mode: bool = False) -> str:
+        # The estimate reserves the completion budget too; the unused part is returned after the call
+        estimate = count_tokens(prompt, self.model) + Config.MAX_TOKENS
         for attempt in range(max_retries):
             try:
-                response = self.client.embeddings.create(
-                    model=Config.EMBEDDING_MODEL,
-                    input=text,
+                async with self.rate_limiter.aslot(estimate) as slot:
+                    raw = await self.async_client.chat.completions.with_raw_response.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        max_tokens=Config.MAX_TOKENS,
+                        temperature=Config.TEMPERATURE,
+                        timeout=30,
+                        **({"response_format": {"type": "json_object"}} if json_mode else {})
+                    )
+                    response = raw.parse()
+                    slot.record(raw.headers, response.usage.total_tokens if response.usage else None)
+                self.last_prompt_tokens = record_usage(self.model, prompt, response.usage)
+                
+                return response.choices[0].message.content.strip()
+                
+            except openai.RateLimitError as e:
+                # The shared limiter has already backed off and holds callers until the quota resets
+                if attempt < max_retries - 1:
+                    continue
+                raise Exception(f"OpenAI API error: {str(e)}")
+            except openai.APITimeoutError as e:
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                raise Exception(f"OpenAI API error: {str(e)}")
+            except Exception as e:
+                raise Exception(f"OpenAI API error: {str(e)}")
+    
+    def chat_completion_stream(self, prompt: str, response_model: Type[BaseModel] = None) -> Iterator[Dict[str, Any]]:
+        # Yields the top-level fields parsed so far whenever another one completes; the last item is the whole object,
+        # validated and repaired like a chat_completion answer
+        json_mode = Config.STRUCTURED_OUTPUT and response_model is not None
+        estimate = count_tokens(prompt, self.model) + Config.MAX_TOKENS
+        parser = PartialJSONParser()
+        content = []
+        try:
+            with self.rate_limiter.slot(estimate) as slot:
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=Config.MAX_TOKENS,
+                    temperature=Config.TEMPERATURE,
+                    stream=True,
+                    **({"response_format": {"type": "json_object"}} if json_mode else {}),
                     timeout=30
                 )
+                
+                completed = 0
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    content.append(delta)
+                    fields = parser.feed(delta)
+                    if len(fields) > completed:
+                        completed = len(fields)
+                        yield dict(fields)
+                
+                text = "".join(content)
+                slot.record(used_tokens=count_tokens(prompt, self.model) + count_tokens(text, self.model))
+            self.last_prompt_tokens = record_usage(self.model, prompt)
+        except Exception as e:
+            raise Exception(f"OpenAI API error: {str(e)}")
+        yield repaired_response(lambda text: self._complete(text, 3, json_mode), json.loads, text.strip(), response_model)
+    
+    def generate_embedding(self, text: str, max_retries: int = 3) -> List[float]:
+        estimate = count_tokens(text)
+        for attempt in range(max_retries):
+            try:
+                with self.embedding_rate_limiter.slot(estimate) as slot:
+                    raw = self.client.embeddings.with_raw_response.create(
+                        model=Config.EMBEDDING_MODEL,
+                        input=text,
+                        timeout=30
+                    )
+                    response = raw.parse()
+                    slot.record(raw.headers, response.usage.total_tokens if response.usage else None)
                 return response.data[0].embedding
                 
-            except (openai.RateLimitError, openai.APITimeoutError) as e:
+            except openai.RateLimitError as e:
+                if attempt < max_retries - 1:
+                    continue
+                raise Exception(f"Embedding API error: {str(e)}")
+            except openai.APITimeoutError as e:
                 if attempt < max_retries - 1:
                     time.sleep(2 ** attempt)
                     continue
@@ -50,6 +172,57 @@ class OpenAIService:
             except Exception as e:
                 raise Exception(f"Embedding API error: {str(e)}")
     
+    def generate_embeddings(self, texts: List[str], max_retries: int = 3) -> List[List[float]]:
+        estimate = sum(count_tokens(text) for text in texts)
+        for attempt in range(max_retries):
+            try:
+                with self.embedding_rate_limiter.slot(estimate) as slot:
+                    raw = self.client.embeddings.with_raw_response.create(
+                        model=Config.EMBEDDING_MODEL,
+                        input=texts,
+                        timeout=30
+                    )
+                    response = raw.parse()
+                    slot.record(raw.headers, response.usage.total_tokens if response.usage else None)
+                return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+                
+            except openai.RateLimitError as e:
+                if attempt < max_retries - 1:
+                    continue
+                raise Exception(f"Embedding API error: {str(e)}")
+            except openai.APITimeoutError as e:
+                if attempt < max_retries - 1:
+                    time.sleep(2 ** attempt)
+                    continue
+                raise Exception(f"Embedding API error: {str(e)}")
+            except Exception as e:
+                raise Exception(f"Embedding API error: {str(e)}")
+    
+    async def agenerate_embedding(self, text: str, max_retries: int = 3) -> List[float]:
+        estimate = count_tokens(text)
+        for attempt in range(max_retries):
+            try:
+                async with self.embedding_rate_limiter.aslot(estimate) as slot:
+                    raw = await self.async_client.embeddings.with_raw_response.create(
+                        model=Config.EMBEDDING_MODEL,
+                        input=text,
+                        timeout=30
+                    )
+                    response = raw.parse()
+                    slot.record(raw.headers, response.usage.total_tokens if response.usage else None)
+                return response.data[0].embedding
+                
+            except openai.RateLimitError as e:
+                if attempt < max_retries - 1:
+                    continue
+                raise Exception(f"Embedding API error: {str(e)}")
+            except openai.APITimeoutError as e:
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                raise Exception(f"Embedding API error: {str(e)}")
+            except Exception as e:
+                raise Exception(f"Embedding API error: {str(e)}")
+    
     def load_prompt(self, prompt_file: str, **kwargs) -> str:
-        with open(f"app/prompts/{prompt_file}", 'r') as f:
-            return f.read().format(**kwargs)
\ No newline at end of file
+        return get_prompt_registry().render(prompt_file, **kwargs)
\ No newline at end of file
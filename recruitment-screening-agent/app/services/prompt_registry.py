@@ -0,0 +1,84 @@
+import hashlib
+import string
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+PROMPTS_DIR = Path(__file__).resolve().parent.parent / "prompts"
+
+# Placeholders each agent passes to its prompt; a template that drifts from these fails at load time
+PROMPT_PLACEHOLDERS: Dict[str, Set[str]] = {
+    "ats_scanner.prompt": {"resume_text"},
+    "ats_screening.prompt": {"resume_text", "job_description"},
+    "ats_screening_packed.prompt": {"candidates", "job_description"},
+    "candidate_ranking.prompt": {"resume_list", "job_description"},
+    "candidate_summary.prompt": {"resume_text"},
+    "explanation.prompt": {"resume_data", "job_requirements", "matching_results"},
+    "full_analysis.prompt": {"sections", "schema", "resume_text", "job_description"},
+    "interview_questions.prompt": {"resume_text", "job_description"},
+    "jd_extraction.prompt": {"job_description"},
+    "json_repair.prompt": {"output", "error", "schema"},
+    "matching_reasoning.prompt": {"resume_data", "job_requirements"},
+    "recruiter_qa.prompt": {"resume_text", "job_description", "question"},
+    "resume_compression.prompt": {"resume_text"},
+    "skill_gap.prompt": {"resume_text", "job_description"},
+}
+
+class PromptRegistry:
+    # Reads every template in app/prompts once, validates its placeholders and renders from memory
+    def __init__(self, prompts_dir: Path = None, expected: Dict[str, Set[str]] = None):
+        self.prompts_dir = Path(prompts_dir or PROMPTS_DIR)
+        expected = PROMPT_PLACEHOLDERS if expected is None else expected
+        self.templates: Dict[str, str] = {}
+        self.placeholders: Dict[str, Set[str]] = {}
+        self.versions: Dict[str, str] = {}
+        
+        for path in sorted(self.prompts_dir.glob("*.prompt")):
+            template = path.read_text(encoding="utf-8")
+            self.templates[path.name] = template
+            self.placeholders[path.name] = self._parse_placeholders(path.name, template)
+            self.versions[path.name] = hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+            
+        for prompt_file, names in expected.items():
+            if prompt_file not in self.templates:
+                raise ValueError(f"Prompt {prompt_file} not found in {self.prompts_dir}")
+            if self.placeholders[prompt_file] != names:
+                raise ValueError(
+                    f"Prompt {prompt_file} placeholders {sorted(self.placeholders[prompt_file])} "
+                    f"do not match the expected {sorted(names)}"
+                )
+                
+        self.version_hash = hashlib.sha256(
+            "".join(f"{name}:{version}" for name, version in sorted(self.versions.items())).encode("utf-8")
+        ).hexdigest()[:16]
+    
+    @staticmethod
+    def _parse_placeholders(prompt_file: str, template: str) -> Set[str]:
+        try:
+            fields = [field for _, field, _, _ in string.Formatter().parse(template) if field is not None]
+        except ValueError as e:
+            raise ValueError(f"Prompt {prompt_file} is not a valid template: {str(e)}")
+        if any(not field.isidentifier() for field in fields):
+            raise ValueError(f"Prompt {prompt_file} has positional or indexed placeholders")
+        return set(fields)
+    
+    def render(self, prompt_file: str, **kwargs) -> str:
+        if prompt_file not in self.templates:
+            raise ValueError(f"Unknown prompt: {prompt_file}")
+        expected = self.placeholders[prompt_file]
+        if set(kwargs) != expected:
+            raise ValueError(f"Prompt {prompt_file} expects {sorted(expected)}, got {sorted(kwargs)}")
+        return self.templates[prompt_file].format(**kwargs)
+    
+    def version(self, prompt_file: str) -> str:
+        return self.versions.get(prompt_file, "")
+
+_shared_registry: Optional[PromptRegistry] = None
+_shared_lock = threading.Lock()
+
+def get_prompt_registry() -> PromptRegistry:
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = PromptRegistry()
+    return _shared_registry
\ No newline at end of file
@@ -0,0 +1,204 @@
+import asyncio
+import re
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Mapping, Optional, Tuple
+from app.config import Config
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    # Reset headers look like "1s", "6m0s" or "20ms"; a bare number is seconds
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts) if parts else None
+
+class _Bucket:
+    # Token bucket refilled continuously at capacity per minute
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+    
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+    
+    def wait_time(self, amount: float) -> float:
+        return 0.0 if self.level >= amount else (amount - self.level) * 60 / self.capacity
+
+class _Slot:
+    def __init__(self):
+        self.headers: Optional[Mapping[str, str]] = None
+        self.used_tokens: Optional[int] = None
+    
+    def record(self, headers: Mapping[str, str] = None, used_tokens: int = None):
+        self.headers = headers
+        self.used_tokens = used_tokens
+
+class RateLimiter:
+    # Shared per-provider limiter: request and token buckets sized to the RPM/TPM quota, plus an
+    # AIMD in-flight limit that halves on every 429 and grows by about one per window of successes.
+    # Rate-limit response headers tighten the buckets and pause callers until the quota resets.
+    def __init__(self, rpm: int, tpm: int, max_concurrency: int = None):
+        self.requests = _Bucket(rpm)
+        self.tokens = _Bucket(tpm)
+        self.max_concurrency = max_concurrency or Config.RATE_LIMIT_MAX_CONCURRENCY
+        self.concurrency = float(self.max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.rate_limited_count = 0
+        self._consecutive_429 = 0
+        self._lock = threading.Lock()
+    
+    def _try_acquire(self, tokens: float) -> float:
+        # Takes a slot and returns 0, or returns how long to wait before trying again
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.concurrency):
+                return 0.05
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            tokens = min(tokens, self.tokens.capacity)
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if wait > 0:
+                return wait
+            self.requests.level -= 1
+            self.tokens.level -= tokens
+            self.in_flight += 1
+            return 0.0
+    
+    def acquire(self, tokens: float):
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(min(wait, 1.0))
+    
+    async def aacquire(self, tokens: float):
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 1.0))
+    
+    def release(self, reserved_tokens: float, used_tokens: int = None, headers: Mapping[str, str] = None, rate_limited: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            if used_tokens is not None:
+                # Hand back the part of the estimate the call did not use
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + max(0.0, min(reserved_tokens, self.tokens.capacity) - used_tokens))
+            if headers:
+                self._apply_headers(headers)
+                
+            if rate_limited:
+                self.rate_limited_count += 1
+                self._consecutive_429 += 1
+                self.concurrency = max(1.0, self.concurrency / 2)
+                retry_after = self._retry_after(headers) if headers else None
+                if retry_after is None:
+                    retry_after = min(2 ** self._consecutive_429, 30)
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            else:
+                self._consecutive_429 = 0
+                self.concurrency = min(float(self.max_concurrency), self.concurrency + 1 / self.concurrency)
+    
+    def _apply_headers(self, headers: Mapping[str, str]):
+        # Both providers report per-minute token limits; request limits differ (per minute vs per day),
+        # so only the remaining counts and reset times are used for requests
+        limit_tokens = headers.get("x-ratelimit-limit-tokens")
+        if limit_tokens and limit_tokens.isdigit():
+            self.tokens.capacity = float(limit_tokens)
+            
+        now = time.monotonic()
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is None or not remaining.isdigit():
+                continue
+            bucket.level = min(bucket.level, float(remaining))
+            if int(remaining) == 0:
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, now + reset)
+    
+    @staticmethod
+    def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            try:
+                return float(retry_after_ms) / 1000
+            except ValueError:
+                pass
+        return parse_duration(headers.get("retry-after"))
+    
+    @staticmethod
+    def _failure(error: Exception):
+        rate_limited = getattr(error, "status_code", None) == 429
+        response = getattr(error, "response", None)
+        return rate_limited, getattr(response, "headers", None)
+    
+    @contextmanager
+    def slot(self, tokens: float):
+        # Wraps one API call; the caller records headers and usage on the yielded slot
+        self.acquire(tokens)
+        slot = _Slot()
+        released = False
+        try:
+            yield slot
+        except Exception as e:
+            rate_limited, headers = self._failure(e)
+            self.release(tokens, headers=headers, rate_limited=rate_limited)
+            released = True
+            raise
+        finally:
+            # Also covers a streaming caller that stops reading early
+            if not released:
+                self.release(tokens, slot.used_tokens, slot.headers)
+    
+    @asynccontextmanager
+    async def aslot(self, tokens: float):
+        await self.aacquire(tokens)
+        slot = _Slot()
+        released = False
+        try:
+            yield slot
+        except Exception as e:
+            rate_limited, headers = self._failure(e)
+            self.release(tokens, headers=headers, rate_limited=rate_limited)
+            released = True
+            raise
+        finally:
+            # Also covers a streaming caller that stops reading early
+            if not released:
+                self.release(tokens, slot.used_tokens, slot.headers)
+    
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'concurrency': int(self.concurrency),
+                'in_flight': self.in_flight,
+                'rate_limited': self.rate_limited_count,
+                'tokens_per_minute': int(self.tokens.capacity)
+            }
+
+_limiters: Dict[Tuple[str, Optional[str]], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str, model: str = None) -> RateLimiter:
+    # One limiter per provider quota ("openai", "openai-embeddings", "groq") and model, shared by every agent and
+    # thread. Providers enforce limits per model, so a 429 on the cascade's small model leaves the large one alone.
+    key = (provider, model)
+    with _limiters_lock:
+        if key not in _limiters:
+            rpm, tpm = Config.MODEL_RATE_LIMITS.get(model) or Config.RATE_LIMITS[provider]
+            _limiters[key] = RateLimiter(rpm, tpm)
+        return _limiters[key]
\ No newline at end of file
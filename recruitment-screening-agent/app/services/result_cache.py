@@ -0,0 +1,107 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Type, TypeVar
+from pydantic import BaseModel
+from app.services.prompt_registry import get_prompt_registry
+from app.config import Config
+
+T = TypeVar("T", bound=BaseModel)
+
+class ResultCache:
+    # Persistent LRU + TTL cache of validated agent results, keyed by a content hash. The SQLite file is
+    # RESULT_CACHE_PATH, ats_result_cache.db in the working directory unless set.
+    def __init__(self, path: str = None, max_entries: int = None, ttl_seconds: float = None):
+        self.path = path or Config.RESULT_CACHE_PATH
+        self.max_entries = max_entries or Config.RESULT_CACHE_MAX_ENTRIES
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else Config.RESULT_CACHE_TTL_SECONDS
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, result_type TEXT NOT NULL, payload TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access)")
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(prompt_file: str, model: str, temperature: float, **prompt_args: Any) -> str:
+        # The template version makes an edited prompt miss instead of serving answers to the old wording
+        version = get_prompt_registry().version(prompt_file)
+        payload = json.dumps([prompt_file, version, model, temperature, prompt_args], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str, result_type: Type[T]) -> Optional[T]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created_at FROM results WHERE key = ? AND result_type = ?",
+                (key, result_type.__name__)
+            ).fetchone()
+            
+            if row is None:
+                self.misses += 1
+                return None
+                
+            payload, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+                
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            
+        return result_type.model_validate_json(payload)
+    
+    def set(self, key: str, result: BaseModel):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, result_type, payload, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, type(result).__name__, result.model_dump_json(), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+    
+    def _evict(self, now: float):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+            
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_access ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'size': size}
+
+_shared_cache: Optional[ResultCache] = None
+_shared_lock = threading.Lock()
+
+def get_result_cache() -> Optional[ResultCache]:
+    global _shared_cache
+    if not Config.RESULT_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ResultCache()
+    return _shared_cache
@@ -0,0 +1,68 @@
+import json
+from typing import Any, Awaitable, Callable, Dict, Type
+from pydantic import BaseModel, ValidationError
+from app.services.prompt_registry import get_prompt_registry
+from app.config import Config
+
+# Fields the application fills in itself and the model should never be asked for
+EXCLUDED_FIELDS = {"decided_by"}
+
+def response_schema(response_model: Type[BaseModel]) -> Dict[str, Any]:
+    # Compact JSON schema of a result model: no titles, no application-only fields
+    def strip(node):
+        if isinstance(node, dict):
+            return {key: strip(value) for key, value in node.items() if key != "title"}
+        if isinstance(node, list):
+            return [strip(value) for value in node]
+        return node
+        
+    schema = strip(response_model.model_json_schema())
+    for node in [schema, *schema.get("$defs", {}).values()]:
+        for field in EXCLUDED_FIELDS:
+            node.get("properties", {}).pop(field, None)
+            if field in node.get("required", []):
+                node["required"].remove(field)
+    return schema
+
+def validate_response(content: str, parse: Callable[[str], Dict[str, Any]], response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+    response = parse(content)
+    if response_model is not None:
+        response_model.model_validate(response)
+    return response
+
+def repair_prompt(content: str, error: Exception, response_model: Type[BaseModel] = None) -> str:
+    # Only the bad output and the error go back, not the original resume and job description
+    schema = response_schema(response_model) if response_model is not None else {"type": "object"}
+    return get_prompt_registry().render(
+        "json_repair.prompt",
+        output=content[:Config.STRUCTURED_REPAIR_MAX_CHARS],
+        error=str(error)[:Config.STRUCTURED_REPAIR_MAX_CHARS],
+        schema=json.dumps(schema)
+    )
+
+def structured_completion(complete: Callable[[str], str], parse: Callable[[str], Dict[str, Any]], prompt: str, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+    # Runs the prompt, then up to STRUCTURED_REPAIR_ATTEMPTS short repair calls if the output does not validate
+    # against response_model. Without a model, bad JSON fails straight away as before.
+    return repaired_response(complete, parse, complete(prompt), response_model)
+
+def repaired_response(complete: Callable[[str], str], parse: Callable[[str], Dict[str, Any]], content: str, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+    # The validation and repair half on its own, for output that has already arrived such as a finished stream
+    repairs = Config.STRUCTURED_REPAIR_ATTEMPTS if response_model is not None else 0
+    for attempt in range(repairs + 1):
+        try:
+            return validate_response(content, parse, response_model)
+        except (json.JSONDecodeError, ValidationError) as e:
+            if attempt == repairs:
+                raise ValueError(f"Invalid JSON response: {str(e)}")
+            content = complete(repair_prompt(content, e, response_model))
+
+async def astructured_completion(complete: Callable[[str], Awaitable[str]], parse: Callable[[str], Dict[str, Any]], prompt: str, response_model: Type[BaseModel] = None) -> Dict[str, Any]:
+    repairs = Config.STRUCTURED_REPAIR_ATTEMPTS if response_model is not None else 0
+    content = await complete(prompt)
+    for attempt in range(repairs + 1):
+        try:
+            return validate_response(content, parse, response_model)
+        except (json.JSONDecodeError, ValidationError) as e:
+            if attempt == repairs:
+                raise ValueError(f"Invalid JSON response: {str(e)}")
+            content = await complete(repair_prompt(content, e, response_model))
\ No newline at end of file
@@ -0,0 +1,65 @@
+import json
+from typing import Any, Dict
+
+class PartialJSONParser:
+    # Incremental parser for a streamed top-level JSON object. feed() takes the next chunk of text
+    # and returns every top-level field whose value is complete so far; text before the opening
+    # brace (a ```json fence, for instance) is skipped.
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        self._buffer = []
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        for char in chunk:
+            if self._finished:
+                break
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+                
+            if self._in_string:
+                self._buffer.append(char)
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+                
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finished = True
+                    self._complete_member()
+                    continue
+            elif char == "," and self._depth == 1:
+                self._complete_member()
+                continue
+            self._buffer.append(char)
+        return self.fields
+    
+    def _complete_member(self):
+        member = "".join(self._buffer).strip()
+        self._buffer = []
+        if not member:
+            return
+        try:
+            self.fields.update(json.loads("{" + member + "}"))
+        except json.JSONDecodeError:
+            pass
+    
+    @property
+    def finished(self) -> bool:
+        return self._finished
\ No newline at end of file
@@ -1,24 +1,176 @@
 import PyPDF2
+import hashlib
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.utils.text_cache import get_parsed_text_cache
+from app.config import Config
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+# Extra wait past PDF_PARSE_TIMEOUT before a worker that ignored its alarm is treated as stuck
+PDF_STALL_GRACE = 5.0
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=Config.PDF_PARSE_WORKERS)
+        return _pool
+
+def _reset_pool(kill: bool = False):
+    # shutdown() cannot stop a worker stuck past its alarm, so a stalled pool has its processes terminated
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            if kill:
+                for process in list((_pool._processes or {}).values()):
+                    process.terminate()
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _submit(data: bytes, timeout: float) -> Future:
+    try:
+        return _get_pool().submit(_extract_in_worker, data, Config.PDF_MAX_PAGES, timeout)
+    except BrokenProcessPool:
+        _reset_pool()
+        return _get_pool().submit(_extract_in_worker, data, Config.PDF_MAX_PAGES, timeout)
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("PDF parsing timed out")
+
+def _extract_in_worker(data: bytes, max_pages: int, timeout: float) -> Dict[str, Any]:
+    # Runs in a pool process. SIGALRM bounds a single slow page where available;
+    # the per-page deadline check covers platforms without it.
+    use_alarm = hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return PDFParser._parse(data, max_pages=max_pages, deadline=time.monotonic() + timeout)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
 
 class PDFParser:
     @staticmethod
     def extract_text(pdf_file) -> str:
+        return PDFParser.parse(pdf_file)['text']
+    
+    @staticmethod
+    def parse(pdf_file) -> Dict[str, Any]:
+        pdf_file.seek(0)
+        return PDFParser.parse_bytes(pdf_file.read())
+    
+    @staticmethod
+    def parse_bytes(data: bytes, max_pages: int = None, max_bytes: int = None, deadline: float = None) -> Dict[str, Any]:
+        # Each unique PDF is parsed once; later calls with the same bytes come from the cache
+        max_pages = max_pages or Config.PDF_MAX_PAGES
+        cache = get_parsed_text_cache()
+        key = PDFParser.cache_key(data, max_pages)
+        entry = cache.get(key)
+        if entry is None:
+            entry = PDFParser._parse(data, max_pages=max_pages, max_bytes=max_bytes, deadline=deadline)
+            cache.set(key, entry)
+        return entry
+    
+    @staticmethod
+    def cache_key(data: bytes, max_pages: int) -> str:
+        return f"{hashlib.sha256(data).hexdigest()}-p{max_pages}"
+    
+    @staticmethod
+    def _parse(data: bytes, max_pages: int, max_bytes: int = None, deadline: float = None) -> Dict[str, Any]:
+        max_bytes = max_bytes or Config.PDF_MAX_BYTES
         try:
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_file.read()))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
+            if len(data) > max_bytes:
+                raise ValueError(f"file is larger than {max_bytes // (1024 * 1024)} MB")
+                
+            pdf_reader = PyPDF2.PdfReader(BytesIO(data))
+            pages = []
+            for page_number, page in enumerate(pdf_reader.pages):
+                if page_number >= max_pages:
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError("PDF parsing timed out")
+                pages.append(page.extract_text() or "")
+            
+            # Only the raw text is cached: ATSAgent cleans it after fitting it to each prompt's token budget
+            return {
+                'text': "\n".join(pages).strip(),
+                'page_count': len(pdf_reader.pages)
+            }
         except Exception as e:
             raise Exception(f"PDF parsing error: {str(e)}")
     
+    @staticmethod
+    def extract_texts(pdf_files: List[Any], timeout: float = None) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+        # Parses uploads on a process pool and yields (name, text, error) in completion order.
+        # A file that fails, is too large or exceeds the timeout yields an error instead of stalling the batch.
+        timeout = timeout or Config.PDF_PARSE_TIMEOUT
+        stall_timeout = timeout + PDF_STALL_GRACE
+        cache = get_parsed_text_cache()
+        pending = {}
+        for pdf_file in pdf_files:
+            pdf_file.seek(0)
+            data = pdf_file.read()
+            if len(data) > Config.PDF_MAX_BYTES:
+                yield pdf_file.name, None, f"PDF parsing error: file is larger than {Config.PDF_MAX_BYTES // (1024 * 1024)} MB"
+                continue
+            
+            key = PDFParser.cache_key(data, Config.PDF_MAX_PAGES)
+            entry = cache.get(key)
+            if entry is not None:
+                yield pdf_file.name, entry['text'], None
+                continue
+            
+            pending[_submit(data, timeout)] = (pdf_file.name, key, data)
+            
+        # A crashed worker breaks every future still on the pool, and a worker stuck past its alarm stalls it.
+        # Neither says which file was at fault, so whatever is unfinished then is parsed one file at a time.
+        isolated = []
+        while pending and not isolated:
+            done, _ = wait(pending, timeout=stall_timeout, return_when=FIRST_COMPLETED)
+            healthy = [future for future in done if not isinstance(future.exception(), BrokenProcessPool)]
+            for future in healthy:
+                name, key, _ = pending.pop(future)
+                yield PDFParser._collect(future, name, key, cache)
+            if len(healthy) < len(done) or not done:
+                _reset_pool(kill=not done)
+                for future, (name, key, data) in pending.items():
+                    if future.done() and not isinstance(future.exception(), BrokenProcessPool):
+                        yield PDFParser._collect(future, name, key, cache)
+                    else:
+                        isolated.append((name, key, data))
+                        
+        for name, key, data in isolated:
+            future = _submit(data, timeout)
+            done, _ = wait([future], timeout=stall_timeout)
+            if not done:
+                _reset_pool(kill=True)
+                yield name, None, "PDF parsing error: PDF parsing timed out"
+            elif isinstance(future.exception(), BrokenProcessPool):
+                _reset_pool()
+                yield name, None, "PDF parsing error: parser process crashed"
+            else:
+                yield PDFParser._collect(future, name, key, cache)
+    
+    @staticmethod
+    def _collect(future: Future, name: str, key: str, cache) -> Tuple[str, Optional[str], Optional[str]]:
+        try:
+            entry = future.result()
+        except Exception as e:
+            return name, None, str(e)
+        cache.set(key, entry)
+        return name, entry['text'], None
+    
     @staticmethod
     def is_valid_pdf(pdf_file) -> bool:
+        # Shares the cached parse with extract_text, so validating first costs no second parse
         try:
-            pdf_file.seek(0)
-            pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_file.read()))
-            return len(pdf_reader.pages) > 0
+            return PDFParser.parse(pdf_file)['page_count'] > 0
         except:
             return False
\ No newline at end of file
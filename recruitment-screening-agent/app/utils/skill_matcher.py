@@ -0,0 +1,106 @@
+import re
+from typing import Dict, List, Set, Tuple
+from app.utils.text_cleaner import TextCleaner
+
+# Canonical skill -> common alternative spellings. Lookups are case-insensitive, except for the forms in
+# CASE_SENSITIVE_FORMS. "cv" is left out on purpose: it almost always means the resume itself.
+SKILL_SYNONYMS: Dict[str, List[str]] = {
+    "javascript": ["js", "ecmascript", "es6"],
+    "typescript": ["ts"],
+    "node.js": ["node", "nodejs", "node js"],
+    "react": ["reactjs", "react.js", "react js"],
+    "vue": ["vuejs", "vue.js", "vue js"],
+    "angular": ["angularjs", "angular.js"],
+    "next.js": ["nextjs", "next js"],
+    "c#": ["csharp", "c sharp"],
+    "c++": ["cpp"],
+    "go": ["golang"],
+    "postgresql": ["postgres", "psql"],
+    "mongodb": ["mongo"],
+    "mysql": ["my sql"],
+    "nosql": ["no-sql", "no sql"],
+    "kubernetes": ["k8s"],
+    "ci/cd": ["cicd", "ci cd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "aws": ["amazon web services"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "azure": ["microsoft azure"],
+    "machine learning": ["ml"],
+    "deep learning": ["dl"],
+    "natural language processing": ["nlp"],
+    "computer vision": [],
+    "artificial intelligence": ["ai"],
+    "large language models": ["llm", "llms", "large language model"],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "rest api": ["rest", "restful", "rest apis", "restful api", "restful apis"],
+    "graphql": ["graph ql"],
+    "html": ["html5"],
+    "css": ["css3"],
+    "spring boot": ["springboot"],
+    "power bi": ["powerbi"],
+}
+
+# Short forms that are also everyday words only count when written the way the skill is: "Go" but not
+# "go hiking", "REST" but not "rest"
+CASE_SENSITIVE_FORMS: Dict[str, List[str]] = {
+    "go": ["Go", "GO"],
+    "rest": ["REST"],
+    "ts": ["TS"],
+    "ai": ["AI"],
+    "ml": ["ML"],
+    "dl": ["DL"],
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./]*")
+_WORD_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#]*")
+
+class SkillMatcher:
+    # Set-based phrase matcher: every skill alias becomes a token tuple, and a resume
+    # is reduced once to the set of its token n-grams, so each lookup is O(1).
+    def __init__(self, synonyms: Dict[str, List[str]] = None):
+        synonyms = SKILL_SYNONYMS if synonyms is None else synonyms
+        self.aliases: Dict[str, Set[Tuple[str, ...]]] = {}
+        for canonical, alternatives in synonyms.items():
+            forms = {self._phrase(term) for term in [canonical, *alternatives]}
+            for form in forms:
+                self.aliases.setdefault(form, set()).update(forms)
+        self.case_sensitive = {self._phrase(term): set(written) for term, written in CASE_SENSITIVE_FORMS.items()}
+    
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        tokens = []
+        for token in _TOKEN_PATTERN.findall(TextCleaner.normalize_text(text)):
+            token = token.rstrip("./")
+            if not token:
+                continue
+            tokens.append(token)
+        return tokens
+    
+    def _phrase(self, term: str) -> Tuple[str, ...]:
+        return tuple(self._tokens(term))
+    
+    def _ngrams(self, text: str, max_len: int) -> Set[Tuple[str, ...]]:
+        tokens = self._tokens(text)
+        grams = set()
+        for i in range(len(tokens)):
+            for n in range(1, max_len + 1):
+                if i + n > len(tokens):
+                    break
+                grams.add(tuple(tokens[i:i + n]))
+            # "python/django" style tokens also count as their separate parts
+            if "/" in tokens[i]:
+                grams.update((part,) for part in tokens[i].split("/") if part)
+        return grams
+    
+    def match(self, text: str, skills: List[str]) -> Tuple[List[str], List[str]]:
+        forms = {skill: self.aliases.get(self._phrase(skill), {self._phrase(skill)}) for skill in skills}
+        max_len = max((len(form) for variants in forms.values() for form in variants), default=1)
+        grams = self._ngrams(text, max_len)
+        words = set(_WORD_PATTERN.findall(text))
+        
+        matched, missing = [], []
+        for skill in skills:
+            if any(form and form in grams and (form not in self.case_sensitive or words & self.case_sensitive[form]) for form in forms[skill]):
+                matched.append(skill)
+            else:
+                missing.append(skill)
+        return matched, missing
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from app.config import Config
+
+class ParsedTextCache:
+    # Bounded in-memory LRU of parsed PDFs keyed by content hash, with an optional on-disk tier
+    def __init__(self, max_entries: int = None, disk_dir: str = None, max_disk_entries: int = None):
+        self.max_entries = max_entries or Config.PARSED_TEXT_CACHE_SIZE
+        self.disk_dir = disk_dir if disk_dir is not None else Config.PARSED_TEXT_CACHE_DIR
+        self.max_disk_entries = max_disk_entries or Config.PARSED_TEXT_CACHE_DISK_SIZE
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._disk_count = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            # Counted once here and kept up to date on writes, so the directory is only listed when pruning
+            self._disk_count = sum(1 for name in os.listdir(self.disk_dir) if name.endswith(".json"))
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+                
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, entry)
+        return entry
+    
+    def set(self, key: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._remember(key, entry)
+        self._write_disk(key, entry)
+    
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+    
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(self._disk_path(key))
+            return entry
+        except (OSError, ValueError):
+            return None
+    
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        is_new = not os.path.exists(path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        with self._disk_lock:
+            self._disk_count += is_new
+            if self._disk_count > self.max_disk_entries:
+                self._prune_disk()
+    
+    def _prune_disk(self):
+        # Evicts the least recently used files down to 90% of the cap, so a full cache is not listed on every write
+        files = [os.path.join(self.disk_dir, name) for name in os.listdir(self.disk_dir) if name.endswith(".json")]
+        keep = int(self.max_disk_entries * 0.9)
+        files.sort(key=os.path.getmtime)
+        removed = 0
+        for path in files[:max(0, len(files) - keep)]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        self._disk_count = len(files) - removed
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+_shared_cache: Optional[ParsedTextCache] = None
+_shared_lock = threading.Lock()
+
+def get_parsed_text_cache() -> ParsedTextCache:
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ParsedTextCache()
+    return _shared_cache
@@ -0,0 +1,173 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.config import Config
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Resume sections in the order they are kept when a resume has to be cut down
+SECTION_PRIORITY = ["skills", "experience", "projects", "summary", "education", "certifications", "achievements"]
+
+SECTION_HEADINGS = {
+    "skills": ["skills", "technical skills", "core skills", "key skills", "skill set", "technologies", "tech stack", "core competencies"],
+    "experience": ["experience", "work experience", "professional experience", "employment", "employment history", "work history", "internships", "internship"],
+    "projects": ["projects", "personal projects", "academic projects", "key projects", "project experience"],
+    "summary": ["summary", "professional summary", "profile", "objective", "career objective", "about me"],
+    "education": ["education", "academic background", "qualifications", "academics"],
+    "certifications": ["certifications", "certificates", "courses", "training"],
+    "achievements": ["achievements", "awards", "honors", "publications", "activities", "extracurricular activities"],
+}
+
+_HEADING_LOOKUP = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+_HEADING_PATTERN = re.compile(r"^[\W_]*([a-z &/]+?)[\s:\-_]*$")
+
+_encodings: Dict[str, object] = {}
+_encodings_lock = threading.Lock()
+
+def _get_encoding(model: str):
+    # Encodings are looked up once per model; a missing package or unreachable BPE file means the char-ratio fallback
+    with _encodings_lock:
+        if model not in _encodings:
+            encoding = None
+            if tiktoken is not None:
+                try:
+                    encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    try:
+                        encoding = tiktoken.get_encoding("cl100k_base")
+                    except Exception:
+                        encoding = None
+                except Exception:
+                    encoding = None
+            _encodings[model] = encoding
+        return _encodings[model]
+
+def count_tokens(text: str, model: str = None) -> int:
+    encoding = _get_encoding(model or "")
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return -(-len(text) // Config.CHARS_PER_TOKEN)
+
+def truncate_tokens(text: str, max_tokens: int, model: str = None) -> str:
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model or "")
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * Config.CHARS_PER_TOKEN]
+
+def context_window(model: str) -> int:
+    return Config.MODEL_CONTEXT_WINDOWS.get(model, Config.DEFAULT_CONTEXT_WINDOW)
+
+def split_sections(resume_text: str) -> List[Tuple[str, str]]:
+    # Splits raw resume text on heading lines; text before the first heading is the "header" (name, contacts)
+    sections = [("header", [])]
+    for line in resume_text.splitlines():
+        stripped = line.strip().lower()
+        match = _HEADING_PATTERN.match(stripped) if len(stripped) <= 40 else None
+        section = _HEADING_LOOKUP.get(match.group(1).strip()) if match else None
+        if section:
+            sections.append((section, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, "\n".join(lines)) for name, lines in sections if any(line.strip() for line in lines)]
+
+class TokenBudget:
+    def __init__(self, model: str):
+        self.model = model
+        window_budget = context_window(model) - Config.MAX_TOKENS
+        self.prompt_budget = min(window_budget, Config.PROMPT_TOKEN_BUDGET) if Config.PROMPT_TOKEN_BUDGET else window_budget
+    
+    def fit_resume(self, resume_text: str, reserved_tokens: int) -> str:
+        # Returns the resume unchanged when it fits next to reserved_tokens (template, JD, ...).
+        # Otherwise keeps whole sections by SECTION_PRIORITY, trims the first one that does not fit,
+        # and emits the kept sections in their original order.
+        budget = self.prompt_budget - reserved_tokens
+        if len(resume_text) <= budget or count_tokens(resume_text, self.model) <= budget:
+            return resume_text
+            
+        sections = split_sections(resume_text)
+        if len(sections) <= 1:
+            return truncate_tokens(resume_text, budget, self.model)
+        
+        def priority(item):
+            index, (name, _) = item
+            if name == "header":
+                return (-1, index)
+            rank = SECTION_PRIORITY.index(name) if name in SECTION_PRIORITY else len(SECTION_PRIORITY)
+            return (rank, index)
+            
+        kept: Dict[int, str] = {}
+        remaining = budget
+        for index, (name, text) in sorted(enumerate(sections), key=priority):
+            if name == "header":
+                text = truncate_tokens(text, Config.RESUME_HEADER_MAX_TOKENS, self.model)
+            tokens = count_tokens(text, self.model) + 1
+            if tokens <= remaining:
+                kept[index] = text
+                remaining -= tokens
+            elif remaining > Config.MIN_SECTION_TOKENS:
+                kept[index] = truncate_tokens(text, remaining - 1, self.model)
+                remaining = 0
+        return "\n".join(kept[index] for index in sorted(kept))
+
+class TokenUsage:
+    # Process-wide prompt/completion token counters per model; cached_tokens is the part of the prompt
+    # tokens the provider served from its prompt prefix cache
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+    
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int = 0, cached_tokens: int = 0):
+        with self._lock:
+            stats = self._stats.setdefault(model, {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0})
+            stats['calls'] += 1
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+            stats['cached_tokens'] += cached_tokens
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {model: dict(stats) for model, stats in self._stats.items()}
+    
+    def since(self, before: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+        # Usage accumulated after the stats() snapshot `before`, for models that made calls since
+        delta = {}
+        for model, stats in self.stats().items():
+            previous = before.get(model, {})
+            if stats['calls'] > previous.get('calls', 0):
+                delta[model] = {field: value - previous.get(field, 0) for field, value in stats.items()}
+        return delta
+
+_shared_usage: Optional[TokenUsage] = None
+_shared_lock = threading.Lock()
+
+def get_token_usage() -> TokenUsage:
+    global _shared_usage
+    with _shared_lock:
+        if _shared_usage is None:
+            _shared_usage = TokenUsage()
+    return _shared_usage
+
+def cached_prompt_tokens(usage) -> int:
+    # prompt_tokens_details.cached_tokens as OpenAI reports it; the pinned SDKs keep it as a plain dict,
+    # and usage from a batch output file is a dict throughout
+    details = usage.get("prompt_tokens_details") if isinstance(usage, dict) else getattr(usage, "prompt_tokens_details", None)
+    if details is None:
+        return 0
+    cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+    return cached or 0
+
+def record_usage(model: str, prompt: str, usage=None) -> int:
+    # Prefers the provider-reported usage; without it the prompt is counted locally
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens or 0
+        cached_tokens = cached_prompt_tokens(usage)
+    else:
+        prompt_tokens, completion_tokens, cached_tokens = count_tokens(prompt, model), 0, 0
+    get_token_usage().record(model, prompt_tokens, completion_tokens, cached_tokens)
+    return prompt_tokens
\ No newline at end of file